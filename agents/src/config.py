@@ -1,6 +1,6 @@
 """Agent configuration."""
 
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from typing import Optional
 
 from pydantic_settings import BaseSettings
@@ -18,6 +18,8 @@ class Settings(BaseSettings):
     pg_user: str = "postgres"
     pg_password: str = "postgres"
     pg_database: str = "freshmart"
+    pg_pool_min: int = 5
+    pg_pool_max: int = 20
 
     # Materialize
     mz_host: str = "mz"
@@ -25,24 +27,39 @@ class Settings(BaseSettings):
     mz_user: str = "materialize"
     mz_password: str = "materialize"
     mz_database: str = "materialize"
+    mz_pool_min: int = 2
+    mz_pool_max: int = 10
 
     # OpenSearch
     agent_os_base: str = "http://opensearch:9200"
 
+    # Have the API validate agent-built orders against the ontology; when false,
+    # only orders failing the local shape check are sent with validate=true
+    agent_strict_validate: bool = True
+
     # LLM
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
     llm_model: str = "claude-sonnet-4-20250514"  # Default for Anthropic; use "gpt-4-turbo" for OpenAI
+    history_window: int = 12  # Most recent user turns sent to the LLM (0 = full history)
+    max_iterations: int = 6  # LLM calls per request before the tool loop is cut off
+    max_tokens_per_session: int = 50000  # LLM tokens per request before the tool loop is cut off
+
+    # LLM response cache (disabled by default): "memory", "sqlite", or "redis"
+    llm_cache: Optional[str] = None
+    llm_cache_path: str = ".langchain_cache.db"
+    redis_url: Optional[str] = None
 
     # Logging
     log_level: str = "INFO"
 
-    @property
+    # DSNs are derived once per (cached) Settings instance
+    @cached_property
     def mz_dsn(self) -> str:
         """Get Materialize connection string."""
         return f"postgresql+asyncpg://{self.mz_user}:{self.mz_password}@{self.mz_host}:{self.mz_port}/{self.mz_database}"
 
-    @property
+    @cached_property
     def pg_dsn(self) -> str:
         """Get PostgreSQL connection string for checkpointing."""
         return f"postgresql://{self.pg_user}:{self.pg_password}@{self.pg_host}:{self.pg_port}/{self.pg_database}"
@@ -52,7 +69,7 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
 
 
-@lru_cache
+@lru_cache(maxsize=None)
 def get_settings() -> Settings:
     """Get cached settings instance."""
     return Settings()
@@ -1,4 +1,4 @@
 # Agent graphs
-from src.graphs.ops_assistant_graph import create_workflow, run_assistant
+from src.graphs.ops_assistant_graph import create_workflow, run_assistant, run_assistant_batch
 
-__all__ = ["create_workflow", "run_assistant"]
+__all__ = ["create_workflow", "run_assistant", "run_assistant_batch"]
@@ -1,14 +1,20 @@
 """FreshMart Operations Assistant - LangGraph implementation."""
 
 import asyncio
-import json
-import operator
+import sys
+from functools import lru_cache
+from importlib.resources import files
 from typing import Annotated, Literal, Optional, TypedDict
 
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+import httpx
+import orjson
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.errors import GraphRecursionError
 from langgraph.graph import END, StateGraph
 from langgraph.prebuilt import ToolNode
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 from src.config import get_settings
 from src.tools import (
@@ -24,14 +30,27 @@ from src.tools import (
     search_orders,
     write_triples,
 )
+from src.tools.http_client import close_http_client
+from src.tools.ontology_schema import prefetch_ontology_schema
+from src.tools.tool_get_store_health import close_store_health_pool
+
+
+def _append_messages(left: list[BaseMessage], right: list[BaseMessage]) -> list[BaseMessage]:
+    """Message reducer: append updates, reusing the existing list when there is nothing to add.
+
+    A new list is still built for real appends; channel values are shared with
+    checkpoints and must not be mutated in place.
+    """
+    return [*left, *right] if right else left
 
 
 # State definition
 class AgentState(TypedDict):
     """State passed through the agent graph."""
 
-    messages: Annotated[list[BaseMessage], operator.add]
-    iteration: int
+    messages: Annotated[list[BaseMessage], _append_messages]
+    total_tokens: int  # LLM tokens used so far in this run
+    agent_calls: int  # LLM calls made so far in this run
 
 
 # Tools
@@ -49,182 +68,86 @@ TOOLS = [
     write_triples,
 ]
 
-# System prompt
-SYSTEM_PROMPT = """You are an operations assistant for FreshMart's same-day grocery delivery service.
-
-**Your Role**: You support FreshMart administrators and customer support agents by helping them manage:
-- Customer orders and order modifications
-- Inventory lookups across stores
-- Order status updates and tracking
-- Customer account creation and management
-
-**You are NOT a customer-facing chatbot.** You assist FreshMart staff members who are helping customers or managing operations.
-
-## MANDATORY FIRST STEP - DO NOT SKIP
-
-**ALWAYS call get_context_graph() FIRST before ANY other tool.**
-
-This is NON-NEGOTIABLE. Your very first tool call for every user request must be get_context_graph().
-NEVER call search_orders, search_inventory, get_store_health, list_stores, or any other tool
-before calling get_context_graph() first.
-
-**Why this matters:** The ontology defines how your business entities connect:
-- Orders link to Customers via `order_customer`
-- Orders link to Stores via `order_store`
-- OrderLines link to Orders via `orderline_order`
-- Products link to Inventory via `inventoryitem_product`
-
-Without this context, you cannot provide accurate, relationship-aware responses.
-
-**CORRECT behavior:**
-1. User asks anything → Call get_context_graph() FIRST
-2. Review the schema to understand entity relationships
-3. THEN call other tools as needed
-
-**WRONG behavior (NEVER do this):**
-- User asks "what's happening in my business?" → Calling get_store_health directly (WRONG!)
-- User asks "find order 123" → Calling search_orders directly (WRONG!)
-
-The ONLY acceptable first tool call is get_context_graph(). No exceptions.
-
-## Common Tasks
-
-**For Customer Support Agents:**
-- Look up existing customer orders by order number or customer name
-- Add or remove items from orders that customers call about
-- Update order status (e.g., mark as delivered, cancel orders)
-- Check product availability at specific store locations
-- Create new orders on behalf of customers calling in
-
-**For Store/Warehouse Staff:**
-- Search for products in inventory
-- Check stock levels across different stores
-- Update order statuses as they're being picked/packed
-- View delivery task assignments
-- Check courier availability and workload by store
-
-**For Administrators:**
-- Create new customer accounts
-- Bulk order lookups and status updates
-- Inventory and operations reporting
-
-## Available Tools
-
-- create_customer: Create a new customer account (requires name)
-- list_stores: List all stores with IDs and zone info (use FIRST when user mentions a store by name)
-- list_couriers: List couriers with status and task info (can filter by store_id or status)
-- search_inventory: Find products in a store's inventory (requires correct store_id)
-- create_order: Create an order with confirmed items
-- manage_order_lines: Add, update, or delete products from an existing order
-- search_orders: Search existing orders
-- fetch_order_context: Get full details for an order
-- get_context_graph: Get the schema of all entity classes and properties
-- get_store_health: Get real-time operational health metrics (capacity, inventory risk, pricing yield)
-- write_triples: Update order status or other data
-
-## CRITICAL: Ontology Validation Rules
-
-**BEFORE using write_triples, you MUST:**
-1. Call get_context_graph to retrieve the current schema
-2. Verify that the predicate you want to use exists in the ontology properties list
-3. Verify that the predicate is valid for the subject's entity class (check domain)
-4. Only proceed with write_triples if the predicate exists and is valid
-
-**If the predicate doesn't exist:**
-- DO NOT attempt to write the triple
-- Inform the user that the operation isn't supported by the ontology
-- Suggest using the appropriate high-level tool instead (e.g., manage_order_lines for order modifications)
-
-**Example validation flow:**
-1. User asks to remove an item from an order
-2. Call get_context_graph to check available predicates
-3. See that there's no "remove_item" predicate
-4. Use manage_order_lines with action="delete" instead
-
-## Workflow Guidelines
-
-**When searching inventory for a specific store:**
-1. If user mentions a store by name (e.g., "Queens store", "Manhattan location"), call list_stores FIRST
-2. Store IDs use abbreviated zone codes: MAN=Manhattan, BK=Brooklyn, QNS=Queens, BX=Bronx, SI=Staten Island
-3. Use the correct store_id from list_stores in your search_inventory call
-4. Example: "Queens store" → list_stores → find store:QNS-01 → search_inventory(store_id="store:QNS-01")
-
-**When helping staff create or modify orders:**
-1. Search for products by name or category using search_inventory
-2. Present found items with live_price (dynamic pricing) and stock levels
-3. For new orders: use create_order with the confirmed items
-4. For existing orders: use manage_order_lines to add/update/delete items
-5. Always use live_price (not base_price) from inventory search results - this includes all 7 dynamic pricing factors
-
-**When looking up orders:**
-1. Use search_orders to find orders by number, customer, or status
-2. Use fetch_order_context to get complete order details
-3. Present information clearly for the staff member
-
-**When updating order status:**
-1. First verify the current status using search_orders
-2. Use write_triples to update order_status predicate
-3. Common statuses: CREATED, PICKING, OUT_FOR_DELIVERY, DELIVERED, CANCELLED
-
-**When checking store operational health:**
-1. Use get_store_health to understand current operational state before making recommendations
-2. Choose appropriate view based on question:
-   - **summary**: "How are all stores doing?" or "What's our overall operational health?"
-   - **quick_check**: "What's happening at Brooklyn store?" (requires store_id)
-   - **capacity**: "Which stores are overloaded?" or "Can we handle more orders?"
-   - **inventory_risk**: "Any inventory emergencies?" or "What products might stock out?"
-3. Proactively check store health before creating large orders or during peak times
-4. Include health metrics in your response to provide context for operational decisions
-5. Use recommendations from the tool to advise staff on actions (e.g., close intake, surge pricing, replenishment)
-
-**CRITICAL: Be precise with health status data:**
-- **NEVER generalize** - Do not say "all stores are critical" unless literally every store has CRITICAL status
-- **Count accurately** - If 7 stores are CRITICAL, 2 are STRAINED, and 1 is HEALTHY, report those exact counts
-- **List specific stores** - When asked about least/most healthy, name the actual stores with their status and utilization %
-- **Differentiate statuses** - CRITICAL, STRAINED, HEALTHY, and UNDERUTILIZED are distinct categories; do not conflate them
-- Example good response: "3 stores are CRITICAL (Manhattan 1 at 155%, Bronx 1 at 147%, Brooklyn 1 at 112%), 2 are STRAINED, and 1 is HEALTHY"
-- Example bad response: "All stores are at critical capacity" (when some are STRAINED or HEALTHY)
-
-**Examples of when to use get_store_health:**
-- Staff asks: "Can we accept a large catering order at Manhattan store?" → Check capacity first
-- Staff reports: "Customer says their order is delayed" → Quick check the fulfilling store's health
-- Manager asks: "What's the state of operations right now?" → Get summary view
-- During order creation: If store shows CRITICAL capacity, warn staff before proceeding
-
-## General Guidelines
-
-- **Be professional**: You're assisting staff, not chatting with customers
-- **Be precise**: Include order numbers, product IDs, and exact prices
-- **Confirm changes**: Before modifying orders, confirm the change with the staff member
-- Default store is store:BK-01 (FreshMart Brooklyn 1) unless specified
-- Show prices in USD format ($X.XX)
-- When working with products, always include current stock availability
-
-## Pricing Guidelines
-
-- **Always show live_price by default** - this is the current dynamic price that customers actually pay
-- Only show base_price if specifically requested or when explaining pricing breakdowns
-- **CRITICAL: Always fetch fresh pricing data** - Whenever a staff member asks about prices, product availability, or inventory:
-  - ALWAYS call search_inventory to get current real-time data
-  - NEVER rely on pricing information from conversation memory or previous tool calls
-  - Prices are dynamic and can change based on stock levels, demand, and time
-  - Even if you just searched for a product, search again if asked about its price
-- The live_price includes 7 real-time pricing factors:
-  1. **Zone adjustments**: Manhattan +15%, Brooklyn +5%, Queens baseline, Bronx -2%, Staten Island -5%
-  2. **Perishable discounts**: -5% for items requiring refrigeration to move inventory faster
-  3. **Local stock premiums**: +10% for ≤5 units at store, +3% for ≤15 units (store-specific scarcity)
-  4. **Popularity adjustments**: Top 3 products +20%, ranks 4-10 +10%, others -10% (by sales volume)
-  5. **Global scarcity premiums**: Top 3 scarcest +15%, ranks 4-10 +8% (total stock across all stores)
-  6. **Demand multipliers**: Based on recent sales price trends and velocity
-  7. **Demand premiums**: +5% for high-demand products above average sales
-- If showing price comparisons, format as: "$5.75 (live price, base: $5.00)"
-- When staff ask about pricing, you can explain which factors are affecting a specific product's price
-"""
+# System prompt (kept as a resource file; read once and interned at import)
+SYSTEM_PROMPT = sys.intern((files("src.graphs") / "prompts" / "ops_assistant.md").read_text(encoding="utf-8"))
+
+# Built once and prepended to every LLM call
+_SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+
+# Anthropic variant: cache_control marks the prompt (and the tool definitions
+# before it) as a cacheable prefix, so repeat turns within the cache TTL are
+# billed and processed at the cached rate
+_CACHED_SYSTEM_MESSAGE = SystemMessage(
+    content=[{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+)
+
+ANTHROPIC_PROMPT_CACHING_BETA = "prompt-caching-2024-07-31"
+
+
+# Set once the process-wide LLM response cache has been installed
+_llm_cache_configured = False
+
+
+def _configure_llm_cache(settings) -> None:
+    """Install the LangChain LLM response cache selected by settings (once per process)."""
+    global _llm_cache_configured
+
+    if _llm_cache_configured or not settings.llm_cache:
+        return
+
+    from langchain_core.globals import set_llm_cache
+
+    backend = settings.llm_cache.lower()
+    if backend == "memory":
+        from langchain_core.caches import InMemoryCache
+
+        set_llm_cache(InMemoryCache())
+    elif backend in ("sqlite", "redis"):
+        # Persistent caches live in langchain-community (optional dependency)
+        try:
+            from langchain_community.cache import RedisCache, SQLiteCache
+        except ImportError as e:
+            raise ValueError(f"LLM_CACHE={settings.llm_cache} requires the langchain-community package") from e
+
+        if backend == "sqlite":
+            set_llm_cache(SQLiteCache(database_path=settings.llm_cache_path))
+        else:
+            if not settings.redis_url:
+                raise ValueError("LLM_CACHE=redis requires REDIS_URL to be set")
+            import redis
+
+            set_llm_cache(RedisCache(redis.Redis.from_url(settings.redis_url)))
+    else:
+        raise ValueError(f"Unknown LLM_CACHE backend: {settings.llm_cache}. Use memory, sqlite, or redis")
+
+    _llm_cache_configured = True
+
+
+# Shared keep-alive HTTP client for OpenAI calls (created on first use)
+_llm_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_llm_http_client() -> httpx.AsyncClient:
+    """Get the pooled HTTP client so every agent turn reuses warm TCP/TLS connections."""
+    global _llm_http_client
+
+    if _llm_http_client is None:
+        _llm_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=60),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+    return _llm_http_client
+
+
+def _is_reasoning_model(model: str) -> bool:
+    """Check whether an OpenAI model is a reasoning model (o1, o3, o4 families)."""
+    return model.startswith(("o1", "o3", "o4"))
 
 
 def get_llm():
     """Get the LLM based on available API keys."""
     settings = get_settings()
+    _configure_llm_cache(settings)
 
     if settings.anthropic_api_key:
         from langchain_anthropic import ChatAnthropic
@@ -232,6 +155,7 @@ def get_llm():
         return ChatAnthropic(
             model=settings.llm_model,
             anthropic_api_key=settings.anthropic_api_key,
+            default_headers={"anthropic-beta": ANTHROPIC_PROMPT_CACHING_BETA},
         )
     elif settings.openai_api_key:
         from langchain_openai import ChatOpenAI
@@ -239,68 +163,175 @@ def get_llm():
         return ChatOpenAI(
             model=settings.llm_model,
             openai_api_key=settings.openai_api_key,
-            temperature=1,  # Required for reasoning models (o1, o3)
+            # Reasoning models (o1, o3) require temperature=1; otherwise use 0 so
+            # tool-choice turns are deterministic and cache keys stay stable
+            temperature=1 if _is_reasoning_model(settings.llm_model) else 0,
+            streaming=True,
+            http_async_client=_get_llm_http_client(),
         )
     else:
         raise ValueError("No LLM API key configured. Set OPENAI_API_KEY or ANTHROPIC_API_KEY")
 
 
+def _content_text(content) -> str:
+    """Extract plain text from message content (str or list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    # Anthropic returns a list of blocks; only text blocks are user-visible
+    return "".join(
+        block.get("text", "")
+        for block in content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_llm_with_tools():
+    """Get the LLM with TOOLS bound (built once; bind_tools serializes every tool schema)."""
+    return get_llm().bind_tools(TOOLS)
+
+
+def _windowed(messages: list[BaseMessage], k: int) -> list[BaseMessage]:
+    """Keep the messages from the k-th most recent HumanMessage onwards.
+
+    Cutting at a user turn keeps every AIMessage tool_calls / ToolMessage pair
+    intact, since tool loops never span a HumanMessage.
+    """
+    if k <= 0:
+        return messages
+
+    seen = 0
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            seen += 1
+            if seen == k:
+                return messages[i:]
+    return messages
+
+
+@lru_cache(maxsize=None)
+def _system_message() -> SystemMessage:
+    """Get the system message for the configured provider (same precedence as get_llm).
+
+    Cached with the bound LLM so the provider is resolved once, not every turn.
+    """
+    # OpenAI caches long prefixes automatically and rejects cache_control blocks
+    return _CACHED_SYSTEM_MESSAGE if get_settings().anthropic_api_key else _SYSTEM_MESSAGE
+
+
+def _reset_llm_cache():
+    """Drop the cached LLM so the next turn picks up new settings or credentials."""
+    _get_llm_with_tools.cache_clear()
+    _system_message.cache_clear()
+
+
+def _fix_ai_message(msg: AIMessage) -> AIMessage:
+    """Give an AI message with tool calls but no content a placeholder text."""
+    if not msg.content and msg.tool_calls:
+        return AIMessage(
+            content="I'll use a tool to help with that.",
+            tool_calls=msg.tool_calls,
+        )
+    return msg
+
+
+def _fix_tool_message(msg: ToolMessage) -> ToolMessage:
+    """Convert empty or list tool results to string content."""
+    if not msg.content:
+        # For tool messages with empty content (e.g., empty list from search),
+        # convert to a string representation
+        return ToolMessage(
+            content="No results found.",
+            tool_call_id=msg.tool_call_id,
+        )
+    if isinstance(msg.content, list):
+        # Ensure list content is converted to string for Anthropic
+        return ToolMessage(
+            content=orjson.dumps(msg.content).decode(),
+            tool_call_id=msg.tool_call_id,
+        )
+    return msg
+
+
+# Exact-type dispatch: history only holds concrete message classes (chunks are
+# merged into AIMessage before they reach state)
+_MESSAGE_FIXERS = {
+    AIMessage: _fix_ai_message,
+    AIMessageChunk: _fix_ai_message,
+    ToolMessage: _fix_tool_message,
+}
+
+
+def _maybe_fix(msg: BaseMessage) -> BaseMessage:
+    """Return msg unchanged, or a copy with content the provider accepts.
+
+    Only the rare empty/list-content AI and tool messages are rebuilt.
+    """
+    content = msg.content
+    if content and isinstance(content, str):
+        return msg
+    fixer = _MESSAGE_FIXERS.get(type(msg))
+    return fixer(msg) if fixer else msg
+
+
 async def agent_node(state: AgentState) -> AgentState:
     """Main agent node - reasons and decides on tool calls."""
-    llm = get_llm()
-    llm_with_tools = llm.bind_tools(TOOLS)
-
-    # Build messages with system prompt, ensuring all messages have non-empty content
-    # (Anthropic API requires non-empty content except for final assistant message)
-    filtered_messages = []
-    for msg in state["messages"]:
-        if isinstance(msg, AIMessage):
-            # For AI messages with tool calls but no content, add placeholder
-            if not msg.content and hasattr(msg, "tool_calls") and msg.tool_calls:
-                msg = AIMessage(
-                    content="I'll use a tool to help with that.",
-                    tool_calls=msg.tool_calls,
-                )
-        elif isinstance(msg, ToolMessage):
-            # For tool messages with empty content (e.g., empty list from search),
-            # convert to a string representation
-            content = msg.content
-            if not content or (isinstance(content, list) and len(content) == 0):
-                msg = ToolMessage(
-                    content="No results found.",
-                    tool_call_id=msg.tool_call_id,
-                )
-            elif isinstance(content, list):
-                # Ensure list content is converted to string for Anthropic
-                msg = ToolMessage(
-                    content=json.dumps(content),
-                    tool_call_id=msg.tool_call_id,
-                )
-        filtered_messages.append(msg)
+    llm_with_tools = _get_llm_with_tools()
+
+    # Window first so only the retained suffix is checked, then ensure all messages have
+    # non-empty content (Anthropic API requires non-empty content except for final assistant message)
+    history = _windowed(state["messages"], get_settings().history_window)
+    filtered_messages = [_maybe_fix(msg) for msg in history]
 
-    messages = [SystemMessage(content=SYSTEM_PROMPT)] + filtered_messages
+    messages = [_system_message(), *filtered_messages]
 
     # Get response
     response = await llm_with_tools.ainvoke(messages)
 
+    usage = response.usage_metadata or {}
     return {
         "messages": [response],
-        "iteration": state["iteration"] + 1,
+        "total_tokens": state.get("total_tokens", 0) + usage.get("total_tokens", 0),
+        "agent_calls": state.get("agent_calls", 0) + 1,
     }
 
 
-def should_continue(state: AgentState) -> Literal["tools", "end"]:
-    """Decide whether to continue with tools or end."""
-    # Check iteration limit
-    if state["iteration"] > 10:
+def should_continue(state: AgentState) -> Literal["tools", "cutoff", "end"]:
+    """Decide whether to continue with tools, cut the run off, or end."""
+    # Check for tool calls in last message (only AI messages have the attribute)
+    if not getattr(state["messages"][-1], "tool_calls", None):
         return "end"
 
-    # Check for tool calls in last message
-    last_message = state["messages"][-1]
-    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-        return "tools"
+    settings = get_settings()
+
+    # Stop runaway tool loops by LLM call count and cumulative token usage. The
+    # pending tool calls still need answers, so the cutoff goes through cutoff_node.
+    if state.get("agent_calls", 0) >= settings.max_iterations:
+        return "cutoff"
+    if state.get("total_tokens", 0) >= settings.max_tokens_per_session:
+        return "cutoff"
+
+    return "tools"
+
 
-    return "end"
+def cutoff_node(state: AgentState) -> AgentState:
+    """Close out a run stopped with tool calls pending.
+
+    Every tool call must be followed by its result or the provider rejects the
+    thread's next turn, so each pending call gets a ToolMessage saying it was
+    not run, then the run ends on the fallback answer.
+    """
+    pending = state["messages"][-1].tool_calls
+    skipped = [
+        ToolMessage(content="Not run: this request reached its usage limit.", tool_call_id=call["id"], name=call["name"])
+        for call in pending
+    ]
+    return {"messages": [*skipped, AIMessage(content="I couldn't complete that request.")]}
+
+
+# Graph building blocks, built once at import and shared by every workflow
+_TOOL_NODE = ToolNode(TOOLS)
+_EDGE_MAP = {"tools": "tools", "cutoff": "cutoff", "end": END}
 
 
 def create_workflow() -> StateGraph:
@@ -309,23 +340,18 @@ def create_workflow() -> StateGraph:
 
     # Add nodes
     workflow.add_node("agent", agent_node)
-    workflow.add_node("tools", ToolNode(TOOLS))
+    workflow.add_node("tools", _TOOL_NODE)
+    workflow.add_node("cutoff", cutoff_node)
 
     # Set entry point
     workflow.set_entry_point("agent")
 
     # Add conditional edges
-    workflow.add_conditional_edges(
-        "agent",
-        should_continue,
-        {
-            "tools": "tools",
-            "end": END,
-        },
-    )
+    workflow.add_conditional_edges("agent", should_continue, _EDGE_MAP)
 
     # Loop back after tools
     workflow.add_edge("tools", "agent")
+    workflow.add_edge("cutoff", END)
 
     return workflow
 
@@ -333,74 +359,131 @@ def create_workflow() -> StateGraph:
 # Cache for compiled graph and checkpointer to avoid recreation on every call
 _cached_checkpointer = None
 _cached_graph = None
-_checkpointer_context = None
+_checkpointer_pool = None
 _init_lock = asyncio.Lock()
 
 
 async def _get_graph_and_checkpointer():
     """Get or create the compiled graph with checkpointer (cached for reuse)."""
-    global _cached_checkpointer, _cached_graph, _checkpointer_context
+    global _cached_checkpointer, _cached_graph, _checkpointer_pool
+
+    # Fast path: once initialized, concurrent turns never touch the lock
+    graph = _cached_graph
+    if graph is not None:
+        return graph
 
-    # Thread-safe initialization with lock
+    # Thread-safe initialization with lock (re-checked: another task may have won the race)
     async with _init_lock:
         if _cached_graph is None:
             settings = get_settings()
             try:
-                # from_conn_string returns a context manager, need to enter it
-                _checkpointer_context = AsyncPostgresSaver.from_conn_string(settings.pg_dsn)
-                _cached_checkpointer = await _checkpointer_context.__aenter__()
+                # Pooled connections so concurrent turns don't serialize on one
+                # connection; kwargs match what from_conn_string would configure
+                _checkpointer_pool = AsyncConnectionPool(
+                    settings.pg_dsn,
+                    min_size=settings.pg_pool_min,
+                    max_size=settings.pg_pool_max,
+                    open=False,
+                    kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                    # Validate connections on checkout so a dropped server connection
+                    # is replaced instead of failing the turn
+                    check=AsyncConnectionPool.check_connection,
+                )
+                await _checkpointer_pool.open()
+                _cached_checkpointer = AsyncPostgresSaver(_checkpointer_pool)
 
                 workflow = create_workflow()
                 _cached_graph = workflow.compile(checkpointer=_cached_checkpointer)
             except Exception:
                 # Clean up partial state on initialization failure
-                if _checkpointer_context and _cached_checkpointer:
+                if _checkpointer_pool is not None:
                     try:
-                        await _checkpointer_context.__aexit__(None, None, None)
+                        await _checkpointer_pool.close()
                     except Exception:
                         pass  # Best effort cleanup
                 _cached_graph = None
                 _cached_checkpointer = None
-                _checkpointer_context = None
+                _checkpointer_pool = None
                 raise
 
     return _cached_graph
 
 
+async def warm_graph_resources():
+    """
+    Build the compiled graph, checkpointer pool and tool-bound LLM ahead of time.
+
+    Call this on application startup so the first request doesn't pay for it.
+    """
+    prefetch_ontology_schema(get_settings().agent_api_base)
+    await _get_graph_and_checkpointer()
+    _get_llm_with_tools()
+    _system_message()
+
+
 async def cleanup_graph_resources():
     """
-    Clean up cached graph resources and exit the checkpointer context.
+    Clean up cached graph resources and close the checkpointer connection pool.
 
-    Call this on application shutdown to properly close database connections.
+    Call this on application shutdown to properly close database, LLM and tool HTTP connections.
     """
-    global _cached_checkpointer, _cached_graph, _checkpointer_context
+    global _cached_checkpointer, _cached_graph, _checkpointer_pool, _llm_http_client
+
+    _reset_llm_cache()
+    if _llm_http_client is not None:
+        await _llm_http_client.aclose()
+        _llm_http_client = None
+    await close_http_client()
+    await close_store_health_pool()
 
     async with _init_lock:
-        if _checkpointer_context and _cached_checkpointer:
+        if _checkpointer_pool is not None:
             try:
-                await _checkpointer_context.__aexit__(None, None, None)
+                await _checkpointer_pool.close()
             except Exception:
                 pass  # Best effort cleanup
 
         _cached_graph = None
         _cached_checkpointer = None
-        _checkpointer_context = None
+        _checkpointer_pool = None
 
 
 async def _reset_cached_graph():
     """Reset the cached graph and checkpointer to force reconnection."""
-    global _cached_checkpointer, _cached_graph, _checkpointer_context
+    global _cached_checkpointer, _cached_graph, _checkpointer_pool
+
+    _reset_llm_cache()
 
     async with _init_lock:
-        if _checkpointer_context and _cached_checkpointer:
+        if _checkpointer_pool is not None:
             try:
-                await _checkpointer_context.__aexit__(None, None, None)
+                await _checkpointer_pool.close()
             except Exception:
                 pass  # Best effort cleanup
 
         _cached_graph = None
         _cached_checkpointer = None
-        _checkpointer_context = None
+        _checkpointer_pool = None
+
+
+def _run_config(thread_id: str) -> dict:
+    """Build the run config for one request on a conversation thread."""
+    # max_iterations is enforced in the graph (should_continue); a run takes at
+    # most 2 * max_iterations supersteps, so the recursion limit is only a backstop
+    recursion_limit = 2 * get_settings().max_iterations + 1
+    return {"configurable": {"thread_id": thread_id}, "recursion_limit": recursion_limit}
+
+
+def _final_ai_response(final_state: AgentState):
+    """Get the final AI response of a finished run, if any.
+
+    Runs always end on agent_node's output, so only the last message needs
+    checking (an earlier AI message would be a previous turn's answer).
+    """
+    last = final_state["messages"][-1]
+    if isinstance(last, AIMessage) and last.content:
+        return last.content
+    return None
 
 
 async def run_assistant(user_message: str, thread_id: str = "default", stream_events: bool = False):
@@ -416,6 +499,7 @@ async def run_assistant(user_message: str, thread_id: str = "default", stream_ev
         tuple[str, Any]: Status updates as (event_type, data) tuples where event_type is one of:
             - "tool_call": {"name": str, "args": dict} - Agent is calling a tool
             - "tool_result": {"content": str} - Tool execution completed
+            - "response_chunk": str - Incremental response text as the LLM generates it
             - "thinking": {"content": str} - Extended thinking content (if available)
             - "error": {"message": str} - An error occurred during execution
             - "response": str - Final response text (always emitted last)
@@ -431,55 +515,77 @@ async def run_assistant(user_message: str, thread_id: str = "default", stream_ev
         else:
             raise
 
+    # Every request starts with get_context_graph; fetch the schema while the
+    # first LLM call is in flight so that tool call returns immediately
+    prefetch_ontology_schema(get_settings().agent_api_base)
+
     # Config with thread_id for conversation memory
-    config = {"configurable": {"thread_id": thread_id}}
+    config = _run_config(thread_id)
 
     initial_state: AgentState = {
         "messages": [HumanMessage(content=user_message)],
-        "iteration": 0,
+        "total_tokens": 0,
+        "agent_calls": 0,
     }
 
     if stream_events:
-        # Stream events to show what's happening
+        # Stream LangChain events so response tokens reach the caller as they are generated
+        # (graph.astream only yields at node boundaries, after the full LLM response)
+        response_parts: list[str] = []
         final_response = None
         try:
-            async for event in graph.astream(initial_state, config):
-                # Agent node processing
-                if "agent" in event:
-                    agent_data = event["agent"]
-                    if "messages" in agent_data and agent_data["messages"]:
-                        last_msg = agent_data["messages"][-1]
-                        if isinstance(last_msg, AIMessage):
-                            if hasattr(last_msg, "tool_calls") and last_msg.tool_calls:
-                                # Agent decided to call tools
-                                for tool_call in last_msg.tool_calls:
-                                    # Handle both dict and object formats
-                                    tool_name = getattr(tool_call, 'name', tool_call.get("name", "unknown") if isinstance(tool_call, dict) else "unknown")
-                                    tool_args = getattr(tool_call, 'args', tool_call.get("args", {}) if isinstance(tool_call, dict) else {})
-                                    yield ("tool_call", {"name": tool_name, "args": tool_args})
-                            elif last_msg.content:
-                                # Agent produced a response
-                                final_response = last_msg.content
-
-                # Tool node processing
-                elif "tools" in event:
-                    tools_data = event["tools"]
-                    if "messages" in tools_data and tools_data["messages"]:
-                        for msg in tools_data["messages"]:
-                            if isinstance(msg, ToolMessage):
-                                # Extract tool name from the message with truncation indicator
-                                content_str = str(msg.content)
-                                if len(content_str) > 150:
-                                    content_preview = content_str[:150] + "..."
-                                else:
-                                    content_preview = content_str
-                                yield ("tool_result", {"content": content_preview})
+            async for event in graph.astream_events(initial_state, config, version="v2"):
+                kind = event["event"]
+
+                if kind == "on_chat_model_start":
+                    # Each LLM call may be the last one, so restart the accumulated response
+                    response_parts = []
+                    final_response = None
+
+                elif kind == "on_chat_model_stream":
+                    delta = _content_text(event["data"]["chunk"].content)
+                    if delta:
+                        response_parts.append(delta)
+                        yield ("response_chunk", delta)
+
+                elif kind == "on_chat_model_end":
+                    # Fall back to the complete message if the provider didn't stream tokens
+                    output = event["data"].get("output")
+                    if output is not None and getattr(output, "tool_calls", None):
+                        # Text before a tool call is a preamble, not the final response
+                        final_response = None
+                    elif response_parts:
+                        final_response = "".join(response_parts)
+                    elif output is not None:
+                        final_response = _content_text(output.content)
+
+                elif kind == "on_tool_start":
+                    # Agent decided to call a tool
+                    yield ("tool_call", {"name": event["name"], "args": event["data"].get("input", {})})
+
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    content = output.content if isinstance(output, ToolMessage) else output
+                    # Truncate long tool results with indicator (structured content is
+                    # rendered as compact JSON rather than a Python repr)
+                    if isinstance(content, str):
+                        content_str = content
+                    else:
+                        content_str = orjson.dumps(content, default=str).decode()
+                    if len(content_str) > 150:
+                        content_preview = content_str[:150] + "..."
+                    else:
+                        content_preview = content_str
+                    yield ("tool_result", {"content": content_preview})
 
             # Yield final response
             if final_response:
                 yield ("response", final_response)
             else:
                 yield ("response", "I couldn't complete that request.")
+        except GraphRecursionError:
+            # Backstop: should_continue normally ends the tool loop first
+            yield ("response", "I couldn't complete that request.")
         except Exception as e:
             error_msg = str(e)
             # If connection closed, reset cache and inform user to retry
@@ -499,17 +605,14 @@ async def run_assistant(user_message: str, thread_id: str = "default", stream_ev
         try:
             final_state = await graph.ainvoke(initial_state, config)
 
-            # Get final AI response
-            response = None
-            for msg in reversed(final_state["messages"]):
-                if isinstance(msg, AIMessage) and msg.content:
-                    response = msg.content
-                    break
-
+            response = _final_ai_response(final_state)
             if response:
                 yield ("response", response)
             else:
                 yield ("response", "I couldn't complete that request.")
+        except GraphRecursionError:
+            # Backstop: should_continue normally ends the tool loop first
+            yield ("response", "I couldn't complete that request.")
         except Exception as e:
             error_msg = str(e)
             # If connection closed, reset cache and inform user to retry
@@ -524,3 +627,46 @@ async def run_assistant(user_message: str, thread_id: str = "default", stream_ev
             else:
                 yield ("error", {"message": error_msg})
                 yield ("response", f"An error occurred: {error_msg}")
+
+
+async def run_assistant_batch(
+    user_messages: list[str],
+    thread_ids: list[str],
+    max_concurrency: int = 10,
+) -> list[str]:
+    """
+    Run the ops assistant over many independent requests concurrently.
+
+    Args:
+        user_messages: Natural language requests, one per run
+        thread_ids: Conversation thread ID for each request (same length as user_messages)
+        max_concurrency: Maximum number of runs in flight at once
+
+    Returns:
+        Final response text for each request, in input order. A failed run yields
+        an "An error occurred: ..." message instead of failing the whole batch.
+    """
+    if len(user_messages) != len(thread_ids):
+        raise ValueError("user_messages and thread_ids must have the same length")
+
+    graph = await _get_graph_and_checkpointer()
+    prefetch_ontology_schema(get_settings().agent_api_base)
+
+    initial_states: list[AgentState] = [
+        {"messages": [HumanMessage(content=message)], "total_tokens": 0, "agent_calls": 0}
+        for message in user_messages
+    ]
+    # max_concurrency is read from the config; always pass it explicitly
+    configs = [{**_run_config(thread_id), "max_concurrency": max_concurrency} for thread_id in thread_ids]
+
+    results = await graph.abatch(initial_states, configs, return_exceptions=True)
+
+    responses = []
+    for result in results:
+        if isinstance(result, GraphRecursionError):
+            responses.append("I couldn't complete that request.")
+        elif isinstance(result, Exception):
+            responses.append(f"An error occurred: {result}")
+        else:
+            responses.append(_final_ai_response(result) or "I couldn't complete that request.")
+    return responses
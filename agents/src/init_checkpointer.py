@@ -43,13 +43,12 @@ def init_checkpointer():
             # WARNING: This drops all existing checkpoint tables and deletes conversation history
             print("  WARNING: Dropping existing checkpoint tables (this deletes all conversation history)...")
             print("  To preserve data, set SKIP_CHECKPOINT_DROP=true")
-            with psycopg.connect(settings.pg_dsn) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("DROP TABLE IF EXISTS checkpoint_blobs CASCADE")
-                    cur.execute("DROP TABLE IF EXISTS checkpoint_writes CASCADE")
-                    cur.execute("DROP TABLE IF EXISTS checkpoints CASCADE")
-                    cur.execute("DROP TABLE IF EXISTS checkpoint_migrations CASCADE")
-                conn.commit()
+            # One statement in autocommit mode: a single round trip, no BEGIN/COMMIT
+            with psycopg.connect(settings.pg_dsn, autocommit=True) as conn:
+                conn.execute(
+                    "DROP TABLE IF EXISTS checkpoint_blobs, checkpoint_writes, checkpoints, "
+                    "checkpoint_migrations CASCADE"
+                )
             print("  ✓ Existing tables dropped")
 
         # Create checkpointer and setup tables with correct schema
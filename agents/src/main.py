@@ -2,8 +2,9 @@
 
 import asyncio
 import logging
+import secrets
 import sys
-import uuid
+import traceback
 
 import typer
 from rich.console import Console
@@ -12,6 +13,15 @@ from rich.panel import Panel
 
 from src.config import get_settings
 
+# Use libuv's event loop for every asyncio.run() below when available
+# (uvloop has no Windows support; fall back to the default loop there)
+try:
+    import uvloop
+
+    uvloop.install()
+except ImportError:
+    pass
+
 # Lazy import for heavy graph module - only import when actually needed
 # This avoids loading langchain/langgraph on every CLI invocation
 run_assistant = None
@@ -33,6 +43,18 @@ def _get_cleanup_function():
         cleanup_graph_resources = _cleanup
     return cleanup_graph_resources
 
+async def _run_then_cleanup(coro):
+    """Run a chat coroutine, then clean up graph resources on the same event loop.
+
+    The DB pool and HTTP clients are bound to the loop that created them, so
+    closing them from a second asyncio.run() would use the wrong loop.
+    """
+    try:
+        await coro
+    finally:
+        if run_assistant is not None:
+            await _get_cleanup_function()()
+
 # Configure logging
 settings = get_settings()
 logging.basicConfig(
@@ -54,6 +76,24 @@ app = typer.Typer(help="FreshMart Operations Assistant CLI")
 console = Console()
 
 
+def _print_tool_event(event_type: str, data: dict) -> None:
+    """Print a one-line tool_call/tool_result progress message."""
+    if event_type == "tool_call":
+        tool_name = data.get("name", "unknown")
+        args_str = ", ".join(f"{k}={repr(v)}" for k, v in data.get("args", {}).items())
+        line = f"Calling {tool_name}({args_str})"
+    else:
+        content = data.get("content", "")
+        line = f"Tool returned: {content if len(content) <= 80 else content[:77] + '...'}"
+
+    if console.is_terminal:
+        # Plain dim text: skip markup parsing and highlighting (tool output may contain [brackets])
+        console.print(line, style="dim", markup=False, highlight=False)
+    else:
+        # Piped output gets no styling anyway, so bypass Rich entirely
+        sys.stdout.write(line + "\n")
+
+
 @app.command()
 def chat(
     message: str = typer.Argument(None, help="Message to send to the assistant"),
@@ -74,7 +114,7 @@ def chat(
     if not message:
         # Interactive mode with persistent event loop and session memory
         # Generate a unique thread_id for this interactive session
-        session_thread_id = thread_id or f"session-{uuid.uuid4().hex[:8]}"
+        session_thread_id = thread_id or f"session-{secrets.token_hex(4)}"
 
         console.print(Panel.fit(
             "[bold green]FreshMart Operations Assistant[/bold green]\n"
@@ -103,17 +143,11 @@ def chat(
                     console.print()  # Blank line before thinking output
                     final_response = None
                     async for event_type, data in _get_run_assistant()(user_input, thread_id=session_thread_id, stream_events=True):
-                        if event_type == "tool_call":
-                            tool_name = data.get("name", "unknown")
-                            args_str = ", ".join(f"{k}={repr(v)}" for k, v in data.get("args", {}).items())
-                            console.print(f"[dim]Calling {tool_name}({args_str})[/dim]")
-                        elif event_type == "tool_result":
-                            content = data.get("content", "")
-                            if len(content) > 80:
-                                content = content[:77] + "..."
-                            console.print(f"[dim]Tool returned: {content}[/dim]")
+                        if event_type in ("tool_call", "tool_result"):
+                            _print_tool_event(event_type, data)
                         elif event_type == "response":
                             final_response = data
+                            break  # Always the last event
 
                     # Display final response
                     if final_response:
@@ -127,22 +161,18 @@ def chat(
                     break
                 except Exception as e:
                     console.print(f"[red]Error: {e}[/red]")
-                    import traceback
-                    console.print(f"[dim]{traceback.format_exc()}[/dim]")
+                    if logging.getLogger().isEnabledFor(logging.DEBUG):
+                        console.print(traceback.format_exc(), style="dim", markup=False)
 
         # Run with a single event loop for the entire session
         try:
-            asyncio.run(interactive_loop())
+            asyncio.run(_run_then_cleanup(interactive_loop()))
         except KeyboardInterrupt:
             console.print("\n[yellow]Goodbye![/yellow]")
-        finally:
-            # Clean up graph resources on exit
-            if run_assistant is not None:
-                asyncio.run(_get_cleanup_function()())
     else:
         # Single message mode
         # Use provided thread_id or generate a one-time ID
-        msg_thread_id = thread_id or f"oneshot-{uuid.uuid4().hex[:8]}"
+        msg_thread_id = thread_id or f"oneshot-{secrets.token_hex(4)}"
 
         # Pre-load heavy imports with loading indicator
         with console.status("[dim]Loading agent...[/dim]"):
@@ -152,17 +182,11 @@ def chat(
             console.print()
             final_response = None
             async for event_type, data in _get_run_assistant()(message, thread_id=msg_thread_id, stream_events=True):
-                if event_type == "tool_call":
-                    tool_name = data.get("name", "unknown")
-                    args_str = ", ".join(f"{k}={repr(v)}" for k, v in data.get("args", {}).items())
-                    console.print(f"[dim]Calling {tool_name}({args_str})[/dim]")
-                elif event_type == "tool_result":
-                    content = data.get("content", "")
-                    if len(content) > 80:
-                        content = content[:77] + "..."
-                    console.print(f"[dim]Tool returned: {content}[/dim]")
+                if event_type in ("tool_call", "tool_result"):
+                    _print_tool_event(event_type, data)
                 elif event_type == "response":
                     final_response = data
+                    break  # Always the last event
 
             if final_response:
                 console.print()
@@ -171,16 +195,12 @@ def chat(
                 console.print("[red]No response received[/red]")
 
         try:
-            asyncio.run(run_once())
+            asyncio.run(_run_then_cleanup(run_once()))
         except Exception as e:
             console.print(f"[red]Error: {e}[/red]")
-            import traceback
-            console.print(f"[dim]{traceback.format_exc()}[/dim]")
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                console.print(traceback.format_exc(), style="dim", markup=False)
             sys.exit(1)
-        finally:
-            # Clean up graph resources on exit
-            if run_assistant is not None:
-                asyncio.run(_get_cleanup_function()())
 
 
 @app.command()
@@ -212,83 +232,20 @@ def serve(
     port: int = typer.Option(8081, help="Port to bind to"),
 ):
     """
-    Run the agent as a simple HTTP service.
+    Run the agent HTTP service (same app as the container's uvicorn command).
 
     POST /chat with JSON {"message": "your question"} to interact with the assistant.
     """
-    from http.server import HTTPServer, BaseHTTPRequestHandler
-    import json
-
-    class AgentHandler(BaseHTTPRequestHandler):
-        def do_GET(self):
-            if self.path == "/health":
-                self.send_response(200)
-                self.send_header("Content-type", "application/json")
-                self.end_headers()
-                self.wfile.write(json.dumps({"status": "healthy"}).encode())
-            else:
-                self.send_response(404)
-                self.end_headers()
+    import uvicorn
 
-        def do_POST(self):
-            if self.path == "/chat":
-                content_length = int(self.headers.get("Content-Length", 0))
-                body = self.rfile.read(content_length)
-                try:
-                    data = json.loads(body)
-                    message = data.get("message", "")
-                    thread_id = data.get("thread_id", f"api-{uuid.uuid4().hex[:8]}")
-
-                    if not message:
-                        self.send_response(400)
-                        self.send_header("Content-type", "application/json")
-                        self.end_headers()
-                        self.wfile.write(json.dumps({"error": "message required"}).encode())
-                        return
-
-                    # Handle the new generator pattern from run_assistant
-                    async def get_response():
-                        async for event_type, data in _get_run_assistant()(message, thread_id=thread_id, stream_events=False):
-                            if event_type == "response":
-                                return data
-                        return "I couldn't complete that request."
-
-                    response = asyncio.run(get_response())
-                    self.send_response(200)
-                    self.send_header("Content-type", "application/json")
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        "response": response,
-                        "thread_id": thread_id
-                    }).encode())
-
-                except Exception as e:
-                    self.send_response(500)
-                    self.send_header("Content-type", "application/json")
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"error": str(e)}).encode())
-            else:
-                self.send_response(404)
-                self.end_headers()
-
-        def log_message(self, format, *args):
-            logging.info("%s - %s", self.address_string(), format % args)
+    from src.server import app as server_app
 
     console.print(f"[bold green]Starting agent server on {host}:{port}[/bold green]")
     console.print("POST /chat with {\"message\": \"your question\"}")
     console.print("GET /health for health check")
 
-    server = HTTPServer((host, port), AgentHandler)
-    try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        console.print("\n[yellow]Shutting down...[/yellow]")
-        server.shutdown()
-    finally:
-        # Clean up graph resources on server shutdown
-        if run_assistant is not None:
-            asyncio.run(_get_cleanup_function()())
-            console.print("[dim]Cleaned up database connections[/dim]")
+    # One event loop for all requests; the app's lifespan cleans up graph resources
+    uvicorn.run(server_app, host=host, port=port, log_level=settings.log_level.lower())
 
 
 if __name__ == "__main__":
@@ -1,22 +1,27 @@
 """FastAPI server for the FreshMart Operations Agent with SSE streaming."""
 
-import json
 import logging
 import os
-import uuid
+import secrets
 from contextlib import asynccontextmanager
 from typing import Optional
 
+import orjson
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
 from src.config import get_settings
-from src.graphs.ops_assistant_graph import cleanup_graph_resources, run_assistant
+from src.graphs.ops_assistant_graph import (
+    cleanup_graph_resources,
+    run_assistant,
+    run_assistant_batch,
+    warm_graph_resources,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -34,18 +39,31 @@ async def lifespan(app: FastAPI):
     if not settings.openai_api_key and not settings.anthropic_api_key:
         logger.error("No LLM API key configured! Set OPENAI_API_KEY or ANTHROPIC_API_KEY")
 
+    # Build the graph, DB pool and LLM client now so the first chat doesn't pay for it
+    try:
+        await warm_graph_resources()
+    except Exception as e:
+        logger.warning("Agent warm-up failed, will initialize on first request: %s", e)
+
     yield
     # Cleanup on shutdown
     await cleanup_graph_resources()
 
 
-# Rate limiter setup
-limiter = Limiter(key_func=get_remote_address)
+# Rate limiter setup. In-memory fixed windows are per process; limits' memory
+# storage expires stale per-IP counters in the background, so it stays bounded.
+# Point RATE_LIMIT_STORAGE_URI at e.g. redis:// to share limits across workers.
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=os.getenv("RATE_LIMIT_STORAGE_URI", "memory://"),
+    strategy="fixed-window",
+)
 
 app = FastAPI(
     title="FreshMart Operations Agent",
     description="AI-powered operations assistant with SSE streaming",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Register rate limiter
@@ -53,7 +71,11 @@ app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # CORS for frontend - restrict origins based on environment
-allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
+allowed_origins = [
+    origin.strip()
+    for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -78,6 +100,22 @@ class ChatResponse(BaseModel):
     thread_id: str
 
 
+class BatchChatRequest(BaseModel):
+    """Request body for the batch chat endpoint."""
+
+    requests: list[ChatRequest] = Field(..., min_length=1, max_length=10, description="Independent chat requests (1-10)")
+
+
+class BatchChatResponse(BaseModel):
+    """Response body for the batch chat endpoint (same order as the request)."""
+
+    results: list[ChatResponse]
+
+
+# Pre-encoded SSE events (yielding bytes spares Starlette an encode per event)
+_SSE_DONE = b'data: {"type":"done","data":{}}\n\n'
+
+
 async def event_generator(message: str, thread_id: str):
     """
     Generate SSE events from the assistant.
@@ -85,6 +123,7 @@ async def event_generator(message: str, thread_id: str):
     Event types:
     - tool_call: {"name": str, "args": dict}
     - tool_result: {"content": str}
+    - response_chunk: str (incremental response text as it is generated)
     - thinking: {"content": str}  (extended thinking if enabled)
     - response: str (final complete response)
     - error: {"message": str}
@@ -93,14 +132,13 @@ async def event_generator(message: str, thread_id: str):
     try:
         async for event_type, data in run_assistant(message, thread_id=thread_id, stream_events=True):
             # Format as SSE
-            event_data = {"type": event_type, "data": data}
-            yield f"data: {json.dumps(event_data)}\n\n"
+            yield b"data: " + orjson.dumps({"type": event_type, "data": data}) + b"\n\n"
 
         # Signal completion
-        yield f"data: {json.dumps({'type': 'done', 'data': {}})}\n\n"
+        yield _SSE_DONE
     except Exception as e:
         error_event = {"type": "error", "data": {"message": str(e)}}
-        yield f"data: {json.dumps(error_event)}\n\n"
+        yield b"data: " + orjson.dumps(error_event) + b"\n\n"
 
 
 @app.post("/chat/stream")
@@ -117,7 +155,7 @@ async def chat_stream(chat_request: ChatRequest, request: Request):
     if not chat_request.message.strip():
         raise HTTPException(status_code=400, detail="message is required")
 
-    thread_id = chat_request.thread_id or f"chat-{uuid.uuid4().hex[:8]}"
+    thread_id = chat_request.thread_id or f"chat-{secrets.token_hex(4)}"
 
     return StreamingResponse(
         event_generator(chat_request.message, thread_id),
@@ -143,7 +181,7 @@ async def chat(chat_request: ChatRequest, request: Request):
     if not chat_request.message.strip():
         raise HTTPException(status_code=400, detail="message is required")
 
-    thread_id = chat_request.thread_id or f"api-{uuid.uuid4().hex[:8]}"
+    thread_id = chat_request.thread_id or f"api-{secrets.token_hex(4)}"
 
     response_text = None
     async for event_type, data in run_assistant(chat_request.message, thread_id=thread_id, stream_events=False):
@@ -157,6 +195,37 @@ async def chat(chat_request: ChatRequest, request: Request):
     return ChatResponse(response=response_text, thread_id=thread_id)
 
 
+@app.post("/chat/batch", response_model=BatchChatResponse)
+# A batch runs up to 10 conversations, so one per minute keeps the LLM budget at /chat's
+@limiter.limit("1/minute")
+async def chat_batch(batch_request: BatchChatRequest, request: Request):
+    """
+    Batch chat endpoint for bulk, non-interactive work.
+
+    Runs every request concurrently through the agent graph and returns the
+    final responses in request order. A failed request returns its error text
+    as the response instead of failing the batch.
+
+    Rate limit: 1 batch (up to 10 conversations) per minute per IP address.
+    """
+    if any(not item.message.strip() for item in batch_request.requests):
+        raise HTTPException(status_code=400, detail="message is required")
+
+    thread_ids = [item.thread_id or f"api-{secrets.token_hex(4)}" for item in batch_request.requests]
+    # Concurrent runs on one thread would race on its checkpoints
+    if len(set(thread_ids)) != len(thread_ids):
+        raise HTTPException(status_code=400, detail="thread_id values must be unique within a batch")
+
+    responses = await run_assistant_batch([item.message for item in batch_request.requests], thread_ids)
+
+    return BatchChatResponse(
+        results=[
+            ChatResponse(response=response, thread_id=thread_id)
+            for response, thread_id in zip(responses, thread_ids)
+        ]
+    )
+
+
 @app.get("/health")
 async def health():
     """Health check endpoint."""
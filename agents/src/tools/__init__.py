@@ -1,15 +1,22 @@
 # Agent tools
-from src.tools.tool_create_customer import create_customer
-from src.tools.tool_create_order import create_order
-from src.tools.tool_fetch_order_context import fetch_order_context
-from src.tools.tool_get_context_graph import get_context_graph
-from src.tools.tool_get_store_health import get_store_health
-from src.tools.tool_list_couriers import list_couriers
-from src.tools.tool_list_stores import list_stores
-from src.tools.tool_manage_order_lines import manage_order_lines
-from src.tools.tool_search_inventory import search_inventory
-from src.tools.tool_search_orders import search_orders
-from src.tools.tool_write_triples import write_triples
+#
+# Tools are imported on first attribute access (PEP 562) so importing a helper
+# such as src.tools.http_client doesn't load every tool module and langchain.
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.tools.tool_create_customer import create_customer
+    from src.tools.tool_create_order import create_order
+    from src.tools.tool_fetch_order_context import fetch_order_context
+    from src.tools.tool_get_context_graph import get_context_graph
+    from src.tools.tool_get_store_health import get_store_health
+    from src.tools.tool_list_couriers import list_couriers
+    from src.tools.tool_list_stores import list_stores
+    from src.tools.tool_manage_order_lines import manage_order_lines
+    from src.tools.tool_search_inventory import search_inventory
+    from src.tools.tool_search_orders import search_orders
+    from src.tools.tool_write_triples import write_triples
 
 __all__ = [
     "create_customer",
@@ -24,3 +31,15 @@ __all__ = [
     "search_orders",
     "write_triples",
 ]
+
+
+def __getattr__(name: str):
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    tool = getattr(importlib.import_module(f"{__name__}.tool_{name}"), name)
+    globals()[name] = tool  # Later lookups skip __getattr__
+    return tool
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
@@ -0,0 +1,51 @@
+"""Shared HTTP client for agent tools.
+
+Tools call the API and OpenSearch several times per agent turn. Sharing one
+pooled client keeps those connections alive between calls instead of paying
+a fresh TCP (and TLS) handshake every time a tool runs.
+"""
+
+from importlib.util import find_spec
+from typing import Optional
+
+import httpx
+
+# For requests that send pre-serialized (orjson) bodies via content=
+JSON_HEADERS = {"content-type": "application/json"}
+
+# HTTP/2 (negotiated over TLS) lets concurrent tool queries share one connection;
+# without the optional h2 package httpx can only speak HTTP/1.1
+_HTTP2 = find_spec("h2") is not None
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared tool HTTP client, creating it on first use."""
+    global _client
+
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=_HTTP2,
+            timeout=10.0,
+            # Tool calls are seconds apart (LLM turns in between); httpx's default
+            # 5s keep-alive expiry would drop the warm connections in that gap
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared tool HTTP client (a new one is created on next use)."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def reset_http_client() -> None:
+    """Forget the shared client without closing it (for tests that mock httpx)."""
+    global _client
+
+    _client = None
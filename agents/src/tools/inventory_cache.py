@@ -0,0 +1,74 @@
+"""Short-lived cache of per-store inventory snapshots.
+
+create_order validates against a store's full inventory, and an agent turn
+often calls it (or fetch_order_context) several times for the same store.
+Snapshots are kept only briefly so stock levels stay close to live, and
+concurrent misses for a store share one in-flight OpenSearch query.
+"""
+
+from typing import Optional
+
+import orjson
+
+from src.tools.http_client import JSON_HEADERS, get_http_client
+from src.tools.ttl_cache import TTLTaskCache
+
+# Long enough to cover one agent turn, short enough to track stock changes
+INVENTORY_TTL_SECONDS = 15.0
+
+# Largest store inventory we expect; matches the previous per-call query
+_STORE_INVENTORY_SIZE = 1000
+
+# Fields read by create_order validation and fetch_order_context pricing;
+# the rest of each inventory document is never used
+INVENTORY_FIELDS = (
+    "product_id",
+    "stock_level",
+    "inventory_id",
+    "live_price",
+    "base_price",
+    "price_change",
+    "perishable",
+)
+
+# Keyed by (os_base, store_id)
+_snapshots = TTLTaskCache(INVENTORY_TTL_SECONDS)
+
+
+async def _fetch_store_inventory(os_base: str, store_id: str) -> list[dict]:
+    """Fetch every inventory document for a store from OpenSearch."""
+    client = get_http_client()
+    response = await client.post(
+        f"{os_base}/inventory/_search",
+        content=orjson.dumps(
+            {
+                "query": {"bool": {"filter": [{"term": {"store_id": store_id}}]}},
+                "size": _STORE_INVENTORY_SIZE,
+                "_source": INVENTORY_FIELDS,
+            }
+        ),
+        headers=JSON_HEADERS,
+        timeout=10.0,
+    )
+    response.raise_for_status()
+    return [hit["_source"] for hit in response.json().get("hits", {}).get("hits", [])]
+
+
+async def get_store_inventory(os_base: str, store_id: str) -> list[dict]:
+    """
+    Get a store's inventory documents, sharing in-flight and recent fetches.
+
+    Raises:
+        httpx.HTTPError: If the inventory could not be fetched
+    """
+    return await _snapshots.get((os_base, store_id), lambda: _fetch_store_inventory(os_base, store_id))
+
+
+def peek_store_inventory(os_base: str, store_id: str) -> Optional[list[dict]]:
+    """Get a store's inventory only if a fresh snapshot is already cached (never fetches)."""
+    return _snapshots.peek((os_base, store_id))
+
+
+def invalidate_store_inventory(os_base: str, store_id: str) -> None:
+    """Forget any cached snapshot for a store (e.g. after placing an order there)."""
+    _snapshots.invalidate((os_base, store_id))
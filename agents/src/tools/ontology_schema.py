@@ -0,0 +1,39 @@
+"""Shared, briefly cached fetch of the ontology schema.
+
+get_context_graph is the mandatory first tool call of every request and
+write_triples re-reads the schema to validate predicates. Both go through
+this module so a prefetched or recent schema is reused instead of re-fetched.
+"""
+
+from src.tools.http_client import get_http_client
+from src.tools.ttl_cache import TTLTaskCache
+
+# The schema only changes when the ontology is edited
+SCHEMA_TTL_SECONDS = 300.0
+
+_schema_cache = TTLTaskCache(SCHEMA_TTL_SECONDS)
+
+
+async def _fetch_schema(api_base: str) -> dict:
+    """Fetch the raw ontology schema from the API."""
+    client = get_http_client()
+    response = await client.get(f"{api_base}/ontology/schema", timeout=10.0)
+    response.raise_for_status()
+    return response.json()
+
+
+async def get_ontology_schema(api_base: str) -> dict:
+    """
+    Get the raw ontology schema, sharing in-flight and recent fetches.
+
+    Raises:
+        httpx.HTTPError: If the schema could not be fetched
+    """
+    return await _schema_cache.get(api_base, lambda: _fetch_schema(api_base))
+
+
+def prefetch_ontology_schema(api_base: str) -> None:
+    """Start fetching the schema in the background (no-op if fresh or already in flight)."""
+    task = _schema_cache.task(api_base, lambda: _fetch_schema(api_base))
+    # Failures surface to whoever awaits the schema; don't log them as unretrieved here
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
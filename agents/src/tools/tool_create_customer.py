@@ -4,9 +4,11 @@ from typing import Optional
 from uuid import uuid4
 
 import httpx
+import orjson
 from langchain_core.tools import tool
 
 from src.config import get_settings
+from src.tools.http_client import JSON_HEADERS, get_http_client
 
 
 @tool
@@ -42,6 +44,10 @@ async def create_customer(
     # Generate unique customer ID
     customer_id = f"customer:{uuid4().hex[:8]}"
 
+    # Always add an address - use provided or create dummy
+    if not address:
+        address = "123 Main St, Brooklyn, NY 11201"
+
     # Build triples for customer
     triples = [
         {
@@ -56,53 +62,49 @@ async def create_customer(
             "object_value": home_store_id,
             "object_type": "entity_ref",
         },
-    ]
-
-    if email:
-        triples.append(
-            {
-                "subject_id": customer_id,
-                "predicate": "customer_email",
-                "object_value": email,
-                "object_type": "string",
-            }
-        )
-
-    # Always add an address - use provided or create dummy
-    if not address:
-        address = "123 Main St, Brooklyn, NY 11201"
-
-    triples.append(
+        *(
+            [
+                {
+                    "subject_id": customer_id,
+                    "predicate": "customer_email",
+                    "object_value": email,
+                    "object_type": "string",
+                }
+            ]
+            if email
+            else []
+        ),
         {
             "subject_id": customer_id,
             "predicate": "customer_address",
             "object_value": address,
             "object_type": "string",
-        }
-    )
+        },
+    ]
 
     # Create customer triples via batch API
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{settings.agent_api_base}/triples/batch",
-                json=triples,
-                params={"validate": True},
-                timeout=10.0,
-            )
-            response.raise_for_status()
-
-            return {
-                "success": True,
-                "customer_id": customer_id,
-                "name": name,
-                "email": email,
-                "address": address,
-                "home_store_id": home_store_id,
-            }
+    client = get_http_client()
+    try:
+        response = await client.post(
+            f"{settings.agent_api_base}/triples/batch",
+            content=orjson.dumps(triples),
+            headers=JSON_HEADERS,
+            params={"validate": True},
+            timeout=10.0,
+        )
+        response.raise_for_status()
+
+        return {
+            "success": True,
+            "customer_id": customer_id,
+            "name": name,
+            "email": email,
+            "address": address,
+            "home_store_id": home_store_id,
+        }
 
-        except httpx.HTTPError as e:
-            return {
-                "success": False,
-                "error": f"Failed to create customer: {str(e)}",
-            }
+    except httpx.HTTPError as e:
+        return {
+            "success": False,
+            "error": f"Failed to create customer: {str(e)}",
+        }
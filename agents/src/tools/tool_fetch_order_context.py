@@ -1,9 +1,54 @@
 """Tool for fetching detailed order context from OpenSearch."""
 
+from collections import defaultdict
+
 import httpx
+import orjson
 from langchain_core.tools import tool
 
 from src.config import get_settings
+from src.tools.http_client import JSON_HEADERS, get_http_client
+from src.tools.inventory_cache import peek_store_inventory
+
+# Inventory fields needed for live pricing
+_PRICING_FIELDS = ("product_id", "live_price", "base_price", "price_change")
+
+# Line item pricing when the store has no inventory record for the product
+_NO_PRICING = {"live_price": None, "base_price": None, "price_change": None}
+
+# Order document fields copied into the tool result
+_ORDER_FIELDS = (
+    "order_id",
+    "order_number",
+    "order_status",
+    "customer_id",
+    "customer_name",
+    "customer_email",
+    "customer_address",
+    "store_id",
+    "store_name",
+    "store_zone",
+    "store_address",
+    "delivery_window_start",
+    "delivery_window_end",
+    "order_total_amount",
+    "assigned_courier_id",
+    "delivery_task_status",
+    "delivery_eta",
+    "line_items",
+    "line_item_count",
+    "has_perishable_items",
+    "effective_updated_at",
+)
+
+
+def _pricing_entry(source: dict) -> dict:
+    """Extract the pricing fields from an inventory document."""
+    return {
+        "live_price": source.get("live_price"),
+        "base_price": source.get("base_price"),
+        "price_change": source.get("price_change"),
+    }
 
 
 async def _fetch_inventory_pricing(
@@ -21,41 +66,65 @@ async def _fetch_inventory_pricing(
 
     pricing_map = {}
 
-    # Query inventory for each store (inventory is store-specific)
+    # Stores create_order just validated against already have a fresh snapshot
+    store_order = []
     for store_id in store_ids:
-        try:
-            inventory_query = {
+        snapshot = peek_store_inventory(settings.agent_os_base, store_id)
+        if snapshot is None:
+            store_order.append(store_id)
+            continue
+        for source in snapshot:
+            product_id = source.get("product_id")
+            if product_id in product_ids:
+                pricing_map[(store_id, product_id)] = _pricing_entry(source)
+
+    if not store_order:
+        return pricing_map
+
+    # One _msearch round trip for the remaining stores (inventory is store-specific):
+    # an empty header line targets the index in the URL, then the query body
+    product_list = list(product_ids)
+    body = b"".join(
+        b"{}\n"
+        + orjson.dumps(
+            {
                 "query": {
                     "bool": {
-                        "must": [
+                        "filter": [
                             {"term": {"store_id": store_id}},
-                            {"terms": {"product_id": list(product_ids)}},
+                            {"terms": {"product_id": product_list}},
                         ]
                     }
                 },
-                "size": len(product_ids),
+                "size": len(product_list),
+                "_source": _PRICING_FIELDS,
             }
-
-            response = await client.post(
-                f"{settings.agent_os_base}/inventory/_search",
-                json=inventory_query,
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            for hit in data.get("hits", {}).get("hits", []):
-                source = hit["_source"]
-                product_id = source.get("product_id")
-                if product_id:
-                    pricing_map[(store_id, product_id)] = {
-                        "live_price": source.get("live_price"),
-                        "base_price": source.get("base_price"),
-                        "price_change": source.get("price_change"),
-                    }
-        except httpx.HTTPError:
-            # If inventory query fails for a store, continue with others
-            pass
+        )
+        + b"\n"
+        for store_id in store_order
+    )
+
+    try:
+        response = await client.post(
+            f"{settings.agent_os_base}/inventory/_msearch",
+            content=body,
+            headers={"content-type": "application/x-ndjson"},
+            timeout=10.0,
+        )
+        response.raise_for_status()
+        responses = response.json().get("responses", [])
+    except httpx.HTTPError:
+        # Pricing is supplementary; fall back to order-time prices
+        return pricing_map
+
+    # Responses come back in request order; a failed store query carries an
+    # "error" instead of hits and just contributes no prices
+    for store_id, result in zip(store_order, responses):
+        for hit in result.get("hits", {}).get("hits", []):
+            source = hit["_source"]
+            product_id = source.get("product_id")
+            if product_id:
+                pricing_map[(store_id, product_id)] = _pricing_entry(source)
 
     return pricing_map
 
@@ -84,93 +153,78 @@ async def fetch_order_context(order_ids: list[str]) -> list[dict]:
     settings = get_settings()
     results = []
 
-    async with httpx.AsyncClient() as client:
-        try:
-            # Query OpenSearch for multiple orders at once
-            search_body = {
-                "query": {
-                    "terms": {
-                        "order_id": order_ids
-                    }
-                },
-                "size": len(order_ids),
-            }
-
-            response = await client.post(
-                f"{settings.agent_os_base}/orders/_search",
-                json=search_body,
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            # Extract order details from hits
-            found_orders = {}
-            for hit in data.get("hits", {}).get("hits", []):
-                source = hit["_source"]
-                order_id = source.get("order_id")
-                if order_id:
-                    found_orders[order_id] = {
-                        "order_id": order_id,
-                        "order_number": source.get("order_number"),
-                        "order_status": source.get("order_status"),
-                        "customer_id": source.get("customer_id"),
-                        "customer_name": source.get("customer_name"),
-                        "customer_email": source.get("customer_email"),
-                        "customer_address": source.get("customer_address"),
-                        "store_id": source.get("store_id"),
-                        "store_name": source.get("store_name"),
-                        "store_zone": source.get("store_zone"),
-                        "store_address": source.get("store_address"),
-                        "delivery_window_start": source.get("delivery_window_start"),
-                        "delivery_window_end": source.get("delivery_window_end"),
-                        "order_total_amount": source.get("order_total_amount"),
-                        "assigned_courier_id": source.get("assigned_courier_id"),
-                        "delivery_task_status": source.get("delivery_task_status"),
-                        "delivery_eta": source.get("delivery_eta"),
-                        "line_items": source.get("line_items", []),
-                        "line_item_count": source.get("line_item_count", 0),
-                        "has_perishable_items": source.get("has_perishable_items"),
-                        "effective_updated_at": source.get("effective_updated_at"),
-                    }
-
-            # Collect all unique store_id and product_id combinations for pricing lookup
-            store_ids = set()
-            product_ids = set()
-            for order in found_orders.values():
-                store_id = order.get("store_id")
-                if store_id:
+    client = get_http_client()
+    try:
+        # Query OpenSearch for multiple orders at once
+        search_body = {
+            # Non-scoring filter context: OpenSearch can cache term/terms filters
+            "query": {
+                "bool": {
+                    "filter": [{"terms": {"order_id": order_ids}}]
+                }
+            },
+            "size": len(order_ids),
+            "_source": _ORDER_FIELDS,
+        }
+
+        response = await client.post(
+            f"{settings.agent_os_base}/orders/_search",
+            content=orjson.dumps(search_body),
+            headers=JSON_HEADERS,
+            timeout=10.0,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        # Extract order details from hits
+        found_orders = {}
+        for hit in data.get("hits", {}).get("hits", []):
+            source = hit["_source"]
+            order_id = source.get("order_id")
+            if order_id:
+                order = {field: source.get(field) for field in _ORDER_FIELDS}
+                order["line_items"] = source.get("line_items", [])
+                order["line_item_count"] = source.get("line_item_count", 0)
+                found_orders[order_id] = order
+
+        # Line items from the denormalized orders view already carry live
+        # pricing; only look up the ones that don't, grouped by lookup key
+        unpriced_items: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        store_ids = set()
+        product_ids = set()
+        for order in found_orders.values():
+            store_id = order.get("store_id")
+            for item in order.get("line_items", []):
+                if item.get("live_price") is not None:
+                    continue
+                product_id = item.get("product_id")
+                unpriced_items[(store_id, product_id)].append(item)
+                if store_id and product_id:
                     store_ids.add(store_id)
-                for item in order.get("line_items", []):
-                    product_id = item.get("product_id")
-                    if product_id:
-                        product_ids.add(product_id)
+                    product_ids.add(product_id)
 
+        if unpriced_items:
             # Fetch live pricing from inventory
             pricing_map = await _fetch_inventory_pricing(
                 client, settings, store_ids, product_ids
             )
 
-            # Enrich line items with live pricing
-            for order in found_orders.values():
-                store_id = order.get("store_id")
-                for item in order.get("line_items", []):
-                    product_id = item.get("product_id")
-                    pricing = pricing_map.get((store_id, product_id), {})
-                    item["live_price"] = pricing.get("live_price")
-                    item["base_price"] = pricing.get("base_price")
-                    item["price_change"] = pricing.get("price_change")
-
-            # Return results in the same order as requested, with errors for missing orders
-            for order_id in order_ids:
-                if order_id in found_orders:
-                    results.append(found_orders[order_id])
-                else:
-                    results.append({"order_id": order_id, "error": "Order not found"})
-
-        except httpx.HTTPError as e:
-            # If OpenSearch query fails, return errors for all orders
-            for order_id in order_ids:
-                results.append({"order_id": order_id, "error": f"Search failed: {str(e)}"})
+            # Enrich line items with live pricing, one lookup per (store, product)
+            for key, items in unpriced_items.items():
+                pricing = pricing_map.get(key, _NO_PRICING)
+                for item in items:
+                    item.update(pricing)
+
+        # Return results in the same order as requested, with errors for missing orders
+        for order_id in order_ids:
+            if order_id in found_orders:
+                results.append(found_orders[order_id])
+            else:
+                results.append({"order_id": order_id, "error": "Order not found"})
+
+    except httpx.HTTPError as e:
+        # If OpenSearch query fails, return errors for all orders
+        for order_id in order_ids:
+            results.append({"order_id": order_id, "error": f"Search failed: {str(e)}"})
 
     return results
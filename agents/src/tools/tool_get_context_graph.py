@@ -1,9 +1,44 @@
 """Tool for retrieving the context graph schema."""
 
+from typing import Optional
+
 import httpx
 from langchain_core.tools import tool
 
 from src.config import get_settings
+from src.tools.ontology_schema import get_ontology_schema
+
+# Summary built from the last schema seen, as (schema, summary). The schema
+# fetch is TTL-cached and returns the same dict until it expires, so repeat
+# calls can skip rebuilding the summary.
+_cached_summary: Optional[tuple[dict, dict]] = None
+
+
+def _summarize_schema(schema: dict) -> dict:
+    """Simplify the raw ontology schema for the agent."""
+    classes_summary = [
+        {
+            "class_name": c["class_name"],
+            "prefix": c["prefix"],
+            "description": c.get("description"),
+        }
+        for c in schema.get("classes", [])
+    ]
+
+    properties_summary = [
+        {
+            "prop_name": p["prop_name"],
+            "domain": p.get("domain_class_name"),
+            "range": p.get("range_class_name") or p["range_kind"],
+            "required": p["is_required"],
+        }
+        for p in schema.get("properties", [])
+    ]
+
+    return {
+        "classes": classes_summary,
+        "properties": properties_summary,
+    }
 
 
 @tool
@@ -19,41 +54,16 @@ async def get_context_graph() -> dict:
     Returns:
         Dictionary with 'classes' and 'properties' lists
     """
+    global _cached_summary
+
     settings = get_settings()
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{settings.agent_api_base}/ontology/schema",
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            schema = response.json()
-
-            # Simplify for the agent
-            classes_summary = [
-                {
-                    "class_name": c["class_name"],
-                    "prefix": c["prefix"],
-                    "description": c.get("description"),
-                }
-                for c in schema.get("classes", [])
-            ]
-
-            properties_summary = [
-                {
-                    "prop_name": p["prop_name"],
-                    "domain": p.get("domain_class_name"),
-                    "range": p.get("range_class_name") or p["range_kind"],
-                    "required": p["is_required"],
-                }
-                for p in schema.get("properties", [])
-            ]
-
-            return {
-                "classes": classes_summary,
-                "properties": properties_summary,
-            }
-
-        except httpx.HTTPError as e:
-            return {"error": f"Failed to fetch context graph: {str(e)}"}
+    try:
+        schema = await get_ontology_schema(settings.agent_api_base)
+
+        if _cached_summary is None or _cached_summary[0] is not schema:
+            _cached_summary = (schema, _summarize_schema(schema))
+        return _cached_summary[1]
+
+    except httpx.HTTPError as e:
+        return {"error": f"Failed to fetch context graph: {str(e)}"}
@@ -1,12 +1,188 @@
 """Get store health metrics for operational decision-making."""
 
-import asyncpg
+import asyncio
+from contextlib import asynccontextmanager
 from typing import Optional
+
+import asyncpg
 from langchain_core.tools import tool
 
 from src.config import get_settings
 
 
+# Health check queries: fixed SQL text with $n parameters (never interpolated)
+
+_CAPACITY_SUMMARY_SQL = """
+    SELECT
+        health_status,
+        COUNT(*) as store_count,
+        ROUND(AVG(current_utilization_pct), 1) as avg_utilization_pct
+    FROM store_capacity_health_mv
+    GROUP BY health_status
+    ORDER BY
+        CASE health_status
+            WHEN 'CRITICAL' THEN 1
+            WHEN 'STRAINED' THEN 2
+            WHEN 'HEALTHY' THEN 3
+            WHEN 'UNDERUTILIZED' THEN 4
+        END
+"""
+
+_RISK_SUMMARY_SQL = """
+    SELECT
+        risk_level,
+        COUNT(*) as item_count,
+        ROUND(SUM(revenue_at_risk)::numeric, 2) as total_revenue_at_risk
+    FROM inventory_risk_mv
+    WHERE risk_level IN ('CRITICAL', 'HIGH')
+    GROUP BY risk_level
+    ORDER BY
+        CASE risk_level
+            WHEN 'CRITICAL' THEN 1
+            WHEN 'HIGH' THEN 2
+        END
+"""
+
+_PRICING_SUMMARY_SQL = """
+    SELECT
+        ROUND(SUM(price_premium)::numeric, 2) as total_premium,
+        ROUND(SUM(base_price * quantity)::numeric, 2) as base_revenue,
+        COUNT(DISTINCT order_id) as delivered_orders
+    FROM pricing_yield_mv
+"""
+
+_CAPACITY_SQL = """
+    SELECT
+        store_id,
+        store_name,
+        store_zone,
+        store_capacity_orders_per_hour,
+        current_active_orders,
+        current_utilization_pct,
+        headroom,
+        health_status,
+        recommended_action
+    FROM store_capacity_health_mv
+    WHERE ($1::text IS NULL OR store_id = $1)
+    ORDER BY current_utilization_pct DESC
+    LIMIT $2
+"""
+
+_RISK_AGGREGATE_SQL = """
+    SELECT
+        COUNT(*) as total_count,
+        ROUND(SUM(revenue_at_risk)::numeric, 2) as total_revenue_at_risk,
+        SUM(CASE WHEN risk_level = 'CRITICAL' THEN 1 ELSE 0 END) as critical_count
+    FROM inventory_risk_mv
+    WHERE ($1::text IS NULL OR store_id = $1)
+      AND ($2::text IS NULL OR category = $2)
+      AND risk_level IN ('CRITICAL', 'HIGH')
+"""
+
+_RISK_ITEMS_SQL = """
+    SELECT
+        inventory_id,
+        store_id,
+        store_name,
+        store_zone,
+        product_id,
+        product_name,
+        category,
+        stock_level,
+        pending_reservations,
+        revenue_at_risk,
+        perishable,
+        risk_level
+    FROM inventory_risk_mv
+    WHERE ($1::text IS NULL OR store_id = $1)
+      AND ($2::text IS NULL OR category = $2)
+      AND risk_level IN ('CRITICAL', 'HIGH')
+    ORDER BY
+        CASE risk_level
+            WHEN 'CRITICAL' THEN 1
+            WHEN 'HIGH' THEN 2
+            WHEN 'MEDIUM' THEN 3
+            WHEN 'LOW' THEN 4
+        END,
+        revenue_at_risk DESC
+    LIMIT $3
+"""
+
+_RISK_LEVEL_AGGREGATE_SQL = """
+    SELECT
+        COUNT(*) as total_count,
+        ROUND(SUM(revenue_at_risk)::numeric, 2) as total_revenue_at_risk,
+        SUM(CASE WHEN risk_level = 'CRITICAL' THEN 1 ELSE 0 END) as critical_count
+    FROM inventory_risk_mv
+    WHERE ($1::text IS NULL OR store_id = $1)
+      AND ($2::text IS NULL OR category = $2)
+      AND risk_level = $3
+"""
+
+_RISK_LEVEL_ITEMS_SQL = """
+    SELECT
+        inventory_id,
+        store_id,
+        store_name,
+        store_zone,
+        product_id,
+        product_name,
+        category,
+        stock_level,
+        pending_reservations,
+        revenue_at_risk,
+        perishable,
+        risk_level
+    FROM inventory_risk_mv
+    WHERE ($1::text IS NULL OR store_id = $1)
+      AND ($2::text IS NULL OR category = $2)
+      AND risk_level = $3
+    ORDER BY
+        CASE risk_level
+            WHEN 'CRITICAL' THEN 1
+            WHEN 'HIGH' THEN 2
+            WHEN 'MEDIUM' THEN 3
+            WHEN 'LOW' THEN 4
+        END,
+        revenue_at_risk DESC
+    LIMIT $4
+"""
+
+_QUICK_CAPACITY_SQL = """
+    SELECT
+        store_name,
+        store_zone,
+        current_active_orders,
+        store_capacity_orders_per_hour,
+        current_utilization_pct,
+        headroom,
+        health_status,
+        recommended_action
+    FROM store_capacity_health_mv
+    WHERE store_id = $1
+"""
+
+_QUICK_RISK_SQL = """
+    SELECT
+        product_name,
+        category,
+        stock_level,
+        pending_reservations,
+        revenue_at_risk,
+        risk_level
+    FROM inventory_risk_mv
+    WHERE store_id = $1
+      AND risk_level IN ('CRITICAL', 'HIGH')
+    ORDER BY
+        CASE risk_level
+            WHEN 'CRITICAL' THEN 1
+            WHEN 'HIGH' THEN 2
+        END,
+        revenue_at_risk DESC
+    LIMIT 5
+"""
+
+
 @tool
 async def get_store_health(
     view: str = "summary",
@@ -66,48 +242,31 @@ async def get_store_health(
             "recommendations": ["Please specify a limit between 1 and 100"],
         }
 
-    settings = get_settings()
-
     try:
-        # Connect to Materialize
-        conn = await asyncpg.connect(
-            host=settings.mz_host,
-            port=settings.mz_port,
-            user=settings.mz_user,
-            password=settings.mz_password,
-            database=settings.mz_database,
-        )
-
-        try:
-            # CRITICAL: Set cluster to serving for indexed queries
-            await conn.execute("SET CLUSTER = serving")
-            await conn.execute("SET transaction_isolation = 'serializable'")
-
-            # Route to appropriate view handler
-            if view == "summary":
-                return await _get_summary(conn)
-            elif view == "capacity":
+        # Route to appropriate view handler
+        if view == "summary":
+            return await _get_summary()
+        elif view == "capacity":
+            async with _connection() as conn:
                 return await _get_capacity(conn, store_id, limit)
-            elif view == "inventory_risk":
+        elif view == "inventory_risk":
+            async with _connection() as conn:
                 return await _get_inventory_risk(conn, store_id, category, risk_level, limit)
-            elif view == "quick_check":
-                if not store_id:
-                    return {
-                        "view": "quick_check",
-                        "error": "store_id is required for quick_check view",
-                        "recommendations": ["Please specify a store_id parameter"],
-                    }
-                return await _get_quick_check(conn, store_id)
-            else:
+        elif view == "quick_check":
+            if not store_id:
                 return {
-                    "view": view,
-                    "error": f"Unknown view type: {view}",
-                    "valid_views": ["summary", "capacity", "inventory_risk", "quick_check"],
-                    "recommendations": ["Use 'summary' for overall health overview"],
+                    "view": "quick_check",
+                    "error": "store_id is required for quick_check view",
+                    "recommendations": ["Please specify a store_id parameter"],
                 }
-
-        finally:
-            await conn.close()
+            return await _get_quick_check(store_id)
+        else:
+            return {
+                "view": view,
+                "error": f"Unknown view type: {view}",
+                "valid_views": ["summary", "capacity", "inventory_risk", "quick_check"],
+                "recommendations": ["Use 'summary' for overall health overview"],
+            }
 
     except Exception as e:
         return {
@@ -120,56 +279,123 @@ async def get_store_health(
         }
 
 
-async def _get_summary(conn: asyncpg.Connection) -> dict:
+# Shared Materialize pool, created on first use and closed with the graph resources
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def _setup_connection(conn: asyncpg.Connection) -> None:
+    """Point a pooled connection at the serving cluster on each checkout.
+
+    Like the API's Materialize routes, which run SET CLUSTER = serving per
+    session rather than relying on a connection startup parameter.
+    """
+    # CRITICAL: Set cluster to serving for indexed queries
+    await conn.execute("SET CLUSTER = serving")
+
+
+async def _reset_connection(conn: asyncpg.Connection) -> None:
+    """Release hook that skips asyncpg's PostgreSQL reset query.
+
+    Materialize reports itself as PostgreSQL, so asyncpg would otherwise send
+    pg_advisory_unlock_all/CLOSE ALL/UNLISTEN/RESET ALL on every release. The
+    health queries only change the cluster, which _setup_connection sets again
+    on the next checkout; asyncpg still rolls back any open transaction first.
+    """
+
+
+async def _get_pool() -> asyncpg.Pool:
+    """Get or create the shared Materialize connection pool."""
+    global _pool
+
+    pool = _pool
+    if pool is not None:
+        return pool
+
+    async with _pool_lock:
+        if _pool is None:
+            settings = get_settings()
+            _pool = await asyncpg.create_pool(
+                host=settings.mz_host,
+                port=settings.mz_port,
+                user=settings.mz_user,
+                password=settings.mz_password,
+                database=settings.mz_database,
+                min_size=settings.mz_pool_min,
+                max_size=settings.mz_pool_max,
+                setup=_setup_connection,
+                reset=_reset_connection,
+                # Disable asyncpg's prepared statement cache (Materialize compatibility,
+                # as in the API): long-lived statements can go stale when views change
+                statement_cache_size=0,
+                # Same startup settings as the API's Materialize engine
+                server_settings={"transaction_isolation": "serializable"},
+            )
+    return _pool
+
+
+async def close_store_health_pool() -> None:
+    """Close the shared Materialize pool (a new one is created on next use)."""
+    global _pool
+
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+
+
+@asynccontextmanager
+async def _connection():
+    """Check out a Materialize connection set up for indexed serving queries."""
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
+        yield conn
+
+
+# asyncpg runs one statement at a time per connection, so these helpers run each
+# query on its own pooled connection; independent queries can then run
+# concurrently under asyncio.gather
+
+
+async def _fetch(query: str, *args) -> list[asyncpg.Record]:
+    """Run one query on its own connection and return all rows."""
+    async with _connection() as conn:
+        return await conn.fetch(query, *args)
+
+
+async def _fetchrow(query: str, *args) -> Optional[asyncpg.Record]:
+    """Run one query on its own connection and return the first row."""
+    async with _connection() as conn:
+        return await conn.fetchrow(query, *args)
+
+
+async def _fetchval(query: str, *args):
+    """Run one query on its own connection and return the first value."""
+    async with _connection() as conn:
+        return await conn.fetchval(query, *args)
+
+
+async def _get_summary() -> dict:
     """Get high-level overview of all three metrics."""
 
-    # Get current timestamp from database
-    current_time = await conn.fetchval("SELECT NOW()")
-
-    # Query 1: Capacity health summary
-    capacity_summary = await conn.fetch("""
-        SELECT
-            health_status,
-            COUNT(*) as store_count,
-            ROUND(AVG(current_utilization_pct), 1) as avg_utilization_pct
-        FROM store_capacity_health_mv
-        GROUP BY health_status
-        ORDER BY
-            CASE health_status
-                WHEN 'CRITICAL' THEN 1
-                WHEN 'STRAINED' THEN 2
-                WHEN 'HEALTHY' THEN 3
-                WHEN 'UNDERUTILIZED' THEN 4
-            END
-    """)
-
-    # Query 2: Inventory risk summary
-    risk_summary = await conn.fetch("""
-        SELECT
-            risk_level,
-            COUNT(*) as item_count,
-            ROUND(SUM(revenue_at_risk)::numeric, 2) as total_revenue_at_risk
-        FROM inventory_risk_mv
-        WHERE risk_level IN ('CRITICAL', 'HIGH')
-        GROUP BY risk_level
-        ORDER BY
-            CASE risk_level
-                WHEN 'CRITICAL' THEN 1
-                WHEN 'HIGH' THEN 2
-            END
-    """)
-
-    # Query 3: Pricing yield summary
-    # Yield = premium / base_revenue (not total revenue, which includes premium)
-    pricing_summary = await conn.fetchrow("""
-        SELECT
-            ROUND(SUM(price_premium)::numeric, 2) as total_premium,
-            ROUND(SUM(base_price * quantity)::numeric, 2) as base_revenue,
-            COUNT(DISTINCT order_id) as delivered_orders
-        FROM pricing_yield_mv
-    """)
-
-    # Build response
+    # The timestamp and the three metric queries are independent; run them concurrently
+    current_time, capacity_summary, risk_summary, pricing_summary = await asyncio.gather(
+        # Current timestamp from database
+        _fetchval("SELECT NOW()"),
+        # Query 1: Capacity health summary
+        _fetch(_CAPACITY_SUMMARY_SQL),
+        # Query 2: Inventory risk summary
+        _fetch(_RISK_SUMMARY_SQL),
+        # Query 3: Pricing yield summary
+        # Yield = premium / base_revenue (not total revenue, which includes premium)
+        _fetchrow(_PRICING_SUMMARY_SQL),
+    )
+    return _build_summary(current_time, capacity_summary, risk_summary, pricing_summary)
+
+
+def _build_summary(current_time, capacity_summary, risk_summary, pricing_summary) -> dict:
+    """Build the summary view from the results of the summary queries."""
+
     capacity_data = {row['health_status']: dict(row) for row in capacity_summary}
     risk_data = {row['risk_level']: dict(row) for row in risk_summary}
 
@@ -231,24 +457,7 @@ async def _get_summary(conn: asyncpg.Connection) -> dict:
 async def _get_capacity(conn: asyncpg.Connection, store_id: Optional[str], limit: int) -> dict:
     """Get per-store capacity utilization."""
 
-    query = """
-        SELECT
-            store_id,
-            store_name,
-            store_zone,
-            store_capacity_orders_per_hour,
-            current_active_orders,
-            current_utilization_pct,
-            headroom,
-            health_status,
-            recommended_action
-        FROM store_capacity_health_mv
-        WHERE ($1::text IS NULL OR store_id = $1)
-        ORDER BY current_utilization_pct DESC
-        LIMIT $2
-    """
-
-    rows = await conn.fetch(query, store_id, limit)
+    rows = await conn.fetch(_CAPACITY_SQL, store_id, limit)
 
     stores = [dict(row) for row in rows]
 
@@ -288,89 +497,17 @@ async def _get_inventory_risk(
     # Use separate queries instead of f-string interpolation to avoid SQL injection
     if not risk_level:
         # Default to CRITICAL and HIGH if no risk_level specified
-        aggregate_query = """
-            SELECT
-                COUNT(*) as total_count,
-                ROUND(SUM(revenue_at_risk)::numeric, 2) as total_revenue_at_risk,
-                SUM(CASE WHEN risk_level = 'CRITICAL' THEN 1 ELSE 0 END) as critical_count
-            FROM inventory_risk_mv
-            WHERE ($1::text IS NULL OR store_id = $1)
-              AND ($2::text IS NULL OR category = $2)
-              AND risk_level IN ('CRITICAL', 'HIGH')
-        """
+        aggregate_query = _RISK_AGGREGATE_SQL
         aggregate_params = [store_id, category]
 
-        items_query = """
-            SELECT
-                inventory_id,
-                store_id,
-                store_name,
-                store_zone,
-                product_id,
-                product_name,
-                category,
-                stock_level,
-                pending_reservations,
-                revenue_at_risk,
-                perishable,
-                risk_level
-            FROM inventory_risk_mv
-            WHERE ($1::text IS NULL OR store_id = $1)
-              AND ($2::text IS NULL OR category = $2)
-              AND risk_level IN ('CRITICAL', 'HIGH')
-            ORDER BY
-                CASE risk_level
-                    WHEN 'CRITICAL' THEN 1
-                    WHEN 'HIGH' THEN 2
-                    WHEN 'MEDIUM' THEN 3
-                    WHEN 'LOW' THEN 4
-                END,
-                revenue_at_risk DESC
-            LIMIT $3
-        """
+        items_query = _RISK_ITEMS_SQL
         item_params = [store_id, category, limit]
     else:
         # Specific risk level provided
-        aggregate_query = """
-            SELECT
-                COUNT(*) as total_count,
-                ROUND(SUM(revenue_at_risk)::numeric, 2) as total_revenue_at_risk,
-                SUM(CASE WHEN risk_level = 'CRITICAL' THEN 1 ELSE 0 END) as critical_count
-            FROM inventory_risk_mv
-            WHERE ($1::text IS NULL OR store_id = $1)
-              AND ($2::text IS NULL OR category = $2)
-              AND risk_level = $3
-        """
+        aggregate_query = _RISK_LEVEL_AGGREGATE_SQL
         aggregate_params = [store_id, category, risk_level]
 
-        items_query = """
-            SELECT
-                inventory_id,
-                store_id,
-                store_name,
-                store_zone,
-                product_id,
-                product_name,
-                category,
-                stock_level,
-                pending_reservations,
-                revenue_at_risk,
-                perishable,
-                risk_level
-            FROM inventory_risk_mv
-            WHERE ($1::text IS NULL OR store_id = $1)
-              AND ($2::text IS NULL OR category = $2)
-              AND risk_level = $3
-            ORDER BY
-                CASE risk_level
-                    WHEN 'CRITICAL' THEN 1
-                    WHEN 'HIGH' THEN 2
-                    WHEN 'MEDIUM' THEN 3
-                    WHEN 'LOW' THEN 4
-                END,
-                revenue_at_risk DESC
-            LIMIT $4
-        """
+        items_query = _RISK_LEVEL_ITEMS_SQL
         item_params = [store_id, category, risk_level, limit]
 
     # First query: Get aggregate totals across ALL matching items (no limit)
@@ -413,23 +550,16 @@ async def _get_inventory_risk(
     }
 
 
-async def _get_quick_check(conn: asyncpg.Connection, store_id: str) -> dict:
+async def _get_quick_check(store_id: str) -> dict:
     """Fast health check for a single store."""
 
-    # Query 1: Store capacity
-    capacity = await conn.fetchrow("""
-        SELECT
-            store_name,
-            store_zone,
-            current_active_orders,
-            store_capacity_orders_per_hour,
-            current_utilization_pct,
-            headroom,
-            health_status,
-            recommended_action
-        FROM store_capacity_health_mv
-        WHERE store_id = $1
-    """, store_id)
+    # Capacity and inventory risk are independent; run them concurrently
+    capacity, risk_items = await asyncio.gather(
+        # Query 1: Store capacity
+        _fetchrow(_QUICK_CAPACITY_SQL, store_id),
+        # Query 2: High-risk inventory at this store
+        _fetch(_QUICK_RISK_SQL, store_id),
+    )
 
     if not capacity:
         return {
@@ -439,27 +569,6 @@ async def _get_quick_check(conn: asyncpg.Connection, store_id: str) -> dict:
             "recommendations": ["Verify store_id is correct (e.g., 'store:BK-01')"],
         }
 
-    # Query 2: High-risk inventory at this store
-    risk_items = await conn.fetch("""
-        SELECT
-            product_name,
-            category,
-            stock_level,
-            pending_reservations,
-            revenue_at_risk,
-            risk_level
-        FROM inventory_risk_mv
-        WHERE store_id = $1
-          AND risk_level IN ('CRITICAL', 'HIGH')
-        ORDER BY
-            CASE risk_level
-                WHEN 'CRITICAL' THEN 1
-                WHEN 'HIGH' THEN 2
-            END,
-            revenue_at_risk DESC
-        LIMIT 5
-    """, store_id)
-
     risk_list = [dict(row) for row in risk_items]
     total_revenue_at_risk = sum(float(item['revenue_at_risk']) for item in risk_list)
 
@@ -4,6 +4,7 @@ import httpx
 from langchain_core.tools import tool
 
 from src.config import get_settings
+from src.tools.http_client import get_http_client
 
 
 @tool
@@ -47,41 +48,41 @@ async def list_couriers(store_id: str = None, status: str = None) -> list[dict]:
     """
     settings = get_settings()
 
-    async with httpx.AsyncClient() as client:
-        try:
-            params = {"limit": 100}
-            if store_id:
-                params["store_id"] = store_id
-            if status:
-                params["status"] = status
-
-            response = await client.get(
-                f"{settings.agent_api_base}/freshmart/couriers",
-                params=params,
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            couriers = response.json()
-
-            # Return simplified courier info with task counts
-            result = []
-            for courier in couriers:
-                tasks = courier.get("tasks", [])
-                active_tasks = sum(1 for t in tasks if t.get("task_status") in ("ASSIGNED", "IN_PROGRESS"))
-                completed_tasks = sum(1 for t in tasks if t.get("task_status") == "COMPLETED")
-
-                result.append({
-                    "courier_id": courier.get("courier_id"),
-                    "courier_name": courier.get("courier_name"),
-                    "home_store_id": courier.get("home_store_id"),
-                    "home_store_name": courier.get("home_store_name"),
-                    "vehicle_type": courier.get("vehicle_type"),
-                    "courier_status": courier.get("courier_status"),
-                    "active_tasks": active_tasks,
-                    "completed_tasks": completed_tasks,
-                })
-
-            return result
-
-        except httpx.HTTPError as e:
-            return [{"error": f"Failed to fetch couriers: {str(e)}"}]
+    client = get_http_client()
+    try:
+        params = {"limit": 100}
+        if store_id:
+            params["store_id"] = store_id
+        if status:
+            params["status"] = status
+
+        response = await client.get(
+            f"{settings.agent_api_base}/freshmart/couriers",
+            params=params,
+            timeout=10.0,
+        )
+        response.raise_for_status()
+        couriers = response.json()
+
+        # Return simplified courier info with task counts
+        result = []
+        for courier in couriers:
+            tasks = courier.get("tasks", [])
+            active_tasks = sum(1 for t in tasks if t.get("task_status") in ("ASSIGNED", "IN_PROGRESS"))
+            completed_tasks = sum(1 for t in tasks if t.get("task_status") == "COMPLETED")
+
+            result.append({
+                "courier_id": courier.get("courier_id"),
+                "courier_name": courier.get("courier_name"),
+                "home_store_id": courier.get("home_store_id"),
+                "home_store_name": courier.get("home_store_name"),
+                "vehicle_type": courier.get("vehicle_type"),
+                "courier_status": courier.get("courier_status"),
+                "active_tasks": active_tasks,
+                "completed_tasks": completed_tasks,
+            })
+
+        return result
+
+    except httpx.HTTPError as e:
+        return [{"error": f"Failed to fetch couriers: {str(e)}"}]
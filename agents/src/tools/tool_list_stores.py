@@ -4,6 +4,34 @@ import httpx
 from langchain_core.tools import tool
 
 from src.config import get_settings
+from src.tools.http_client import get_http_client
+from src.tools.ttl_cache import TTLTaskCache
+
+# Stores are effectively static; reuse the list across tool calls for a minute
+STORES_TTL_SECONDS = 60.0
+
+_stores_cache = TTLTaskCache(STORES_TTL_SECONDS)
+
+
+async def _fetch_stores(api_base: str) -> list[dict]:
+    """Fetch all stores from the API, simplified to the fields the tool returns."""
+    client = get_http_client()
+    response = await client.get(f"{api_base}/freshmart/stores", timeout=10.0)
+    response.raise_for_status()
+    return [
+        {
+            "store_id": store.get("store_id"),
+            "store_name": store.get("store_name"),
+            "zone": store.get("store_zone"),
+            "address": store.get("store_address"),
+        }
+        for store in response.json()
+    ]
+
+
+async def _get_stores(api_base: str) -> list[dict]:
+    """Get all stores, sharing in-flight and recent fetches."""
+    return await _stores_cache.get(api_base, lambda: _fetch_stores(api_base))
 
 
 @tool
@@ -38,30 +66,13 @@ async def list_stores(zone: str = None) -> list[dict]:
     """
     settings = get_settings()
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{settings.agent_api_base}/freshmart/stores",
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            stores = response.json()
-
-            # Filter by zone if provided (API uses store_zone)
-            if zone:
-                stores = [s for s in stores if s.get("store_zone") == zone]
-
-            # Return simplified store info
-            return [
-                {
-                    "store_id": store.get("store_id"),
-                    "store_name": store.get("store_name"),
-                    "zone": store.get("store_zone"),
-                    "address": store.get("store_address"),
-                }
-                for store in stores
-            ]
-
-        except httpx.HTTPError:
-            # Return empty list on error instead of error dict
-            return []
+    try:
+        stores = await _get_stores(settings.agent_api_base)
+    except httpx.HTTPError:
+        # Return empty list on error instead of error dict
+        return []
+
+    # Filter by zone if provided
+    if zone:
+        return [store for store in stores if store["zone"] == zone]
+    return list(stores)
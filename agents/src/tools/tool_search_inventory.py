@@ -1,11 +1,22 @@
 """Tool for searching store inventory with dynamic pricing."""
 
-from typing import Optional
-
 import httpx
+import orjson
 from langchain_core.tools import tool
 
 from src.config import get_settings
+from src.tools.http_client import JSON_HEADERS, get_http_client
+
+# Dynamic pricing multipliers, included in results when present
+_PRICING_ADJUSTMENTS = (
+    "zone_adjustment",
+    "perishable_adjustment",
+    "local_stock_adjustment",
+    "popularity_adjustment",
+    "scarcity_adjustment",
+    "demand_multiplier",
+    "demand_premium",
+)
 
 
 @tool
@@ -57,113 +68,82 @@ async def search_inventory(
     """
     settings = get_settings()
 
-    async with httpx.AsyncClient() as client:
-        try:
-            # Step 1: Search inventory in OpenSearch
-            inventory_query = {
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"term": {"store_id": store_id}}
-                        ]
-                    }
-                },
-                "size": 1000,  # Get all inventory for the store
+    client = get_http_client()
+    try:
+        # Let OpenSearch match the query (product name/category prefixes with the
+        # ingredient synonyms, exact category or product ID) and return only the top hits
+        inventory_query = {
+            "query": {
+                "bool": {
+                    "must": [
+                        {"term": {"store_id": store_id}},
+                        {
+                            "bool": {
+                                "should": [
+                                    {
+                                        "multi_match": {
+                                            "query": query,
+                                            "fields": ["product_name^2", "category"],
+                                            "type": "phrase_prefix",
+                                        }
+                                    },
+                                    {"term": {"category.keyword": query}},
+                                    {"term": {"product_id": query}},
+                                ],
+                                "minimum_should_match": 1,
+                            }
+                        },
+                    ]
+                }
+            },
+            "size": limit,
+        }
+
+        inventory_response = await client.post(
+            f"{settings.agent_os_base}/inventory/_search",
+            content=orjson.dumps(inventory_query),
+            headers=JSON_HEADERS,
+            timeout=10.0,
+        )
+        inventory_response.raise_for_status()
+        inventory_data = inventory_response.json()
+
+        results = []
+        for hit in inventory_data.get("hits", {}).get("hits", []):
+            source = hit["_source"]
+            product_id = source.get("product_id")
+            if not product_id:
+                continue
+
+            result = {
+                "product_id": product_id,
+                "product_name": source.get("product_name", product_id),
+                "category": source.get("category", "Unknown"),
+                # Dynamic pricing fields
+                "base_price": source.get("base_price"),
+                "live_price": source.get("live_price"),
+                "price_change": source.get("price_change"),
+                # Inventory details
+                "store_id": store_id,
+                "store_zone": source.get("store_zone"),
+                "quantity_available": source.get("stock_level", 0),
+                "replenishment_eta": source.get("replenishment_eta"),
+                "is_perishable": source.get("perishable", False),
             }
 
-            inventory_response = await client.post(
-                f"{settings.agent_os_base}/inventory/_search",
-                json=inventory_query,
-                timeout=10.0,
-            )
-            inventory_response.raise_for_status()
-            inventory_data = inventory_response.json()
-
-            # Extract inventory records with all product and pricing data
-            inventory_items = {}
-            for hit in inventory_data.get("hits", {}).get("hits", []):
-                source = hit["_source"]
-                product_id = source.get("product_id")
-                if product_id:
-                    inventory_items[product_id] = {
-                        "product_name": source.get("product_name"),
-                        "category": source.get("category"),
-                        "stock_level": source.get("stock_level", 0),
-                        "replenishment_eta": source.get("replenishment_eta"),
-                        "perishable": source.get("perishable", False),
-                        # Dynamic pricing fields
-                        "base_price": source.get("base_price"),
-                        "live_price": source.get("live_price"),
-                        "price_change": source.get("price_change"),
-                        # All 7 pricing adjustments
-                        "zone_adjustment": source.get("zone_adjustment"),
-                        "perishable_adjustment": source.get("perishable_adjustment"),
-                        "local_stock_adjustment": source.get("local_stock_adjustment"),
-                        "popularity_adjustment": source.get("popularity_adjustment"),
-                        "scarcity_adjustment": source.get("scarcity_adjustment"),
-                        "demand_multiplier": source.get("demand_multiplier"),
-                        "demand_premium": source.get("demand_premium"),
-                        # Store info
-                        "store_zone": source.get("store_zone"),
-                        "store_name": source.get("store_name"),
-                    }
-
-            if not inventory_items:
-                return []
-
-            # Step 2: Filter products by search query (all data is now in inventory_items)
-            results = []
-            query_lower = query.lower()
-
-            for product_id, inv_info in inventory_items.items():
-                product_name = inv_info.get("product_name", product_id)
-                category = inv_info.get("category", "Unknown")
-
-                # Search in product name, category, or product_id
-                if (query_lower in product_name.lower() or
-                    query_lower in category.lower() or
-                    query_lower in product_id.lower()):
-
-                    result = {
-                        "product_id": product_id,
-                        "product_name": product_name,
-                        "category": category,
-                        # Dynamic pricing fields
-                        "base_price": inv_info.get("base_price"),
-                        "live_price": inv_info.get("live_price"),
-                        "price_change": inv_info.get("price_change"),
-                        # Inventory details
-                        "store_id": store_id,
-                        "store_zone": inv_info.get("store_zone"),
-                        "quantity_available": inv_info.get("stock_level", 0),
-                        "replenishment_eta": inv_info.get("replenishment_eta"),
-                        "is_perishable": inv_info.get("perishable", False),
-                    }
-
-                    # Add all 7 pricing adjustments if available (optional, for detailed queries)
-                    if inv_info.get("zone_adjustment") is not None:
-                        result["zone_adjustment"] = inv_info.get("zone_adjustment")
-                    if inv_info.get("perishable_adjustment") is not None:
-                        result["perishable_adjustment"] = inv_info.get("perishable_adjustment")
-                    if inv_info.get("local_stock_adjustment") is not None:
-                        result["local_stock_adjustment"] = inv_info.get("local_stock_adjustment")
-                    if inv_info.get("popularity_adjustment") is not None:
-                        result["popularity_adjustment"] = inv_info.get("popularity_adjustment")
-                    if inv_info.get("scarcity_adjustment") is not None:
-                        result["scarcity_adjustment"] = inv_info.get("scarcity_adjustment")
-                    if inv_info.get("demand_multiplier") is not None:
-                        result["demand_multiplier"] = inv_info.get("demand_multiplier")
-                    if inv_info.get("demand_premium") is not None:
-                        result["demand_premium"] = inv_info.get("demand_premium")
-
-                    # Add warning if price is missing
-                    if inv_info.get("live_price") is None:
-                        result["warning"] = "Price information unavailable for this product"
-
-                    results.append(result)
-
-            # Return top results up to limit
-            return results[:limit]
-
-        except httpx.HTTPError as e:
-            return [{"error": f"Search failed: {str(e)}"}]
+            # Add all 7 pricing adjustments if available (optional, for detailed queries)
+            for field in _PRICING_ADJUSTMENTS:
+                value = source.get(field)
+                if value is not None:
+                    result[field] = value
+
+            # Add warning if price is missing
+            if source.get("live_price") is None:
+                result["warning"] = "Price information unavailable for this product"
+
+            results.append(result)
+
+        return results
+
+    except httpx.HTTPError as e:
+        return [{"error": f"Search failed: {str(e)}"}]
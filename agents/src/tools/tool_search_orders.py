@@ -6,6 +6,7 @@ import httpx
 from langchain_core.tools import tool
 
 from src.config import get_settings
+from src.tools.http_client import get_http_client
 
 
 @tool
@@ -82,38 +83,38 @@ async def search_orders(
         "sort": [{"effective_updated_at": {"order": "desc"}}],
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{settings.agent_os_base}/orders/_search",
-                json=search_body,
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            hits = data.get("hits", {}).get("hits", [])
-            return [
-                {
-                    "order_id": hit["_source"]["order_id"],
-                    "order_number": hit["_source"].get("order_number"),
-                    "order_status": hit["_source"].get("order_status"),
-                    "customer_name": hit["_source"].get("customer_name"),
-                    "customer_address": hit["_source"].get("customer_address"),
-                    "store_name": hit["_source"].get("store_name"),
-                    "store_zone": hit["_source"].get("store_zone"),
-                    "delivery_window_start": hit["_source"].get("delivery_window_start"),
-                    "delivery_window_end": hit["_source"].get("delivery_window_end"),
-                    "order_total_amount": hit["_source"].get("order_total_amount"),
-                    "promo_code": hit["_source"].get("promo_code"),
-                    "discount_percent": hit["_source"].get("discount_percent"),
-                    "order_total_amount_with_discounts": hit["_source"].get("order_total_amount_with_discounts"),
-                    "line_items": hit["_source"].get("line_items", []),
-                    "line_item_count": hit["_source"].get("line_item_count", 0),
-                    "has_perishable_items": hit["_source"].get("has_perishable_items"),
-                    "score": hit.get("_score"),
-                }
-                for hit in hits
-            ]
-        except httpx.HTTPError as e:
-            return [{"error": f"Search failed: {str(e)}"}]
+    client = get_http_client()
+    try:
+        response = await client.post(
+            f"{settings.agent_os_base}/orders/_search",
+            json=search_body,
+            timeout=10.0,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        hits = data.get("hits", {}).get("hits", [])
+        return [
+            {
+                "order_id": hit["_source"]["order_id"],
+                "order_number": hit["_source"].get("order_number"),
+                "order_status": hit["_source"].get("order_status"),
+                "customer_name": hit["_source"].get("customer_name"),
+                "customer_address": hit["_source"].get("customer_address"),
+                "store_name": hit["_source"].get("store_name"),
+                "store_zone": hit["_source"].get("store_zone"),
+                "delivery_window_start": hit["_source"].get("delivery_window_start"),
+                "delivery_window_end": hit["_source"].get("delivery_window_end"),
+                "order_total_amount": hit["_source"].get("order_total_amount"),
+                "promo_code": hit["_source"].get("promo_code"),
+                "discount_percent": hit["_source"].get("discount_percent"),
+                "order_total_amount_with_discounts": hit["_source"].get("order_total_amount_with_discounts"),
+                "line_items": hit["_source"].get("line_items", []),
+                "line_item_count": hit["_source"].get("line_item_count", 0),
+                "has_perishable_items": hit["_source"].get("has_perishable_items"),
+                "score": hit.get("_score"),
+            }
+            for hit in hits
+        ]
+    except httpx.HTTPError as e:
+        return [{"error": f"Search failed: {str(e)}"}]
@@ -0,0 +1,84 @@
+"""Single-flight TTL cache of asyncio fetch tasks.
+
+Several tools reuse reference data (ontology schema, store list, store
+inventory) across the calls of an agent turn. Each cache keeps one fetch
+task per key: concurrent misses share the in-flight task, a successful
+result is reused until its TTL runs out, and a failed fetch is retried on
+the next call. Tasks belong to the event loop that started them, so
+entries are keyed by (key, running loop).
+"""
+
+import asyncio
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+# Every cache, so tests can start from a clean slate (see reset_ttl_caches)
+_caches: "weakref.WeakSet[TTLTaskCache]" = weakref.WeakSet()
+
+
+class TTLTaskCache:
+    """Share in-flight and recent fetch results per key for ttl_seconds."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        # (key, loop) -> (fetch task, expires_at)
+        self._entries: dict[tuple, tuple[asyncio.Task, float]] = {}
+        _caches.add(self)
+
+    def _entry(self, key: Hashable) -> Optional[tuple[asyncio.Task, float]]:
+        """Get the reusable entry for key on the running loop, if any."""
+        entry = self._entries.get((key, asyncio.get_running_loop()))
+        if entry is None:
+            return None
+        task, expires_at = entry
+        # In flight, or finished successfully within the TTL
+        if not task.done():
+            return entry
+        if task.cancelled() or task.exception() is not None:
+            return None
+        return entry if time.monotonic() < expires_at else None
+
+    def _prune_expired(self) -> None:
+        """Drop finished entries past their TTL so the cache stays bounded."""
+        now = time.monotonic()
+        for entry_key, (task, expires_at) in list(self._entries.items()):
+            if task.done() and now >= expires_at:
+                del self._entries[entry_key]
+
+    def task(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Get the shared task for key, starting fetch() if nothing reusable is cached."""
+        entry = self._entry(key)
+        if entry is None:
+            self._prune_expired()
+            loop = asyncio.get_running_loop()
+            entry = (loop.create_task(fetch()), time.monotonic() + self.ttl_seconds)
+            self._entries[(key, loop)] = entry
+        return entry[0]
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Get the value for key, sharing in-flight and recent fetches."""
+        # Shield the shared task so a cancelled caller doesn't cancel it for everyone
+        return await asyncio.shield(self.task(key, fetch))
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Get the value for key only if a fresh result is already cached (never fetches)."""
+        entry = self._entry(key)
+        if entry is None or not entry[0].done():
+            return None
+        return entry[0].result()
+
+    def invalidate(self, key: Hashable) -> None:
+        """Forget key on every loop so the next call fetches it again."""
+        for entry_key in [k for k in self._entries if k[0] == key]:
+            del self._entries[entry_key]
+
+    def reset(self) -> None:
+        """Forget every entry."""
+        self._entries.clear()
+
+
+def reset_ttl_caches() -> None:
+    """Forget the entries of every TTLTaskCache."""
+    for cache in list(_caches):
+        cache.reset()
@@ -4,6 +4,26 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
 
+@pytest.fixture(autouse=True)
+def reset_ttl_caches():
+    """Start every test without cached ontology schema, store list, or inventory."""
+    from src.tools.ttl_cache import reset_ttl_caches
+
+    reset_ttl_caches()
+    yield
+    reset_ttl_caches()
+
+
+@pytest.fixture(autouse=True)
+def reset_http_client():
+    """Give every test a fresh shared tool client so mocked httpx.AsyncClient is picked up."""
+    from src.tools.http_client import reset_http_client
+
+    reset_http_client()
+    yield
+    reset_http_client()
+
+
 @pytest.fixture
 def mock_settings():
     """Mock settings for agent tools."""
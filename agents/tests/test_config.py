@@ -69,3 +69,11 @@ class TestConfigLoading:
         settings = get_settings()
         assert "postgresql" in settings.mz_dsn
         assert settings.mz_host in settings.mz_dsn
+
+    def test_dsn_is_computed_once_per_instance(self):
+        """DSN properties are cached on the settings instance."""
+        from src.config import Settings
+
+        settings = Settings(pg_host="pg.example")
+        assert settings.pg_dsn is settings.pg_dsn
+        assert "@pg.example:" in settings.pg_dsn
@@ -5,6 +5,50 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def reset_graph_cache():
+    """Reset the module-level compiled graph cache so each test builds its own mock graph."""
+    import src.graphs.ops_assistant_graph as graph_module
+
+    graph_module._cached_graph = None
+    graph_module._cached_checkpointer = None
+    graph_module._checkpointer_pool = None
+    graph_module._llm_http_client = None
+    yield
+    graph_module._cached_graph = None
+    graph_module._cached_checkpointer = None
+    graph_module._checkpointer_pool = None
+    graph_module._llm_http_client = None
+
+
+@pytest.fixture(autouse=True)
+def mock_ontology_prefetch():
+    """Keep run_assistant's schema prefetch from starting real HTTP requests."""
+    with patch("src.graphs.ops_assistant_graph.prefetch_ontology_schema") as mock_prefetch:
+        yield mock_prefetch
+
+
+@pytest.fixture(autouse=True)
+def mock_checkpointer_pool():
+    """Replace the psycopg pool so no test opens a real database connection."""
+    with patch("src.graphs.ops_assistant_graph.AsyncConnectionPool") as mock_pool:
+        mock_pool.return_value.open = AsyncMock()
+        mock_pool.return_value.close = AsyncMock()
+        yield mock_pool
+
+
+def _model_events(*chunks, tool_calls=None):
+    """Build the astream_events sequence for one streamed LLM call."""
+    from langchain_core.messages import AIMessage, AIMessageChunk
+
+    events = [{"event": "on_chat_model_start", "name": "ChatAnthropic", "data": {}}]
+    for chunk in chunks:
+        events.append({"event": "on_chat_model_stream", "name": "ChatAnthropic", "data": {"chunk": AIMessageChunk(content=chunk)}})
+    output = AIMessage(content="".join(c for c in chunks if isinstance(c, str)), tool_calls=tool_calls or [])
+    events.append({"event": "on_chat_model_end", "name": "ChatAnthropic", "data": {"output": output}})
+    return events
+
+
 class TestRunAssistantStreaming:
     """Tests for run_assistant event streaming."""
 
@@ -14,22 +58,17 @@ class TestRunAssistantStreaming:
         with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
             mock_settings.return_value.pg_dsn = "postgresql://test"
 
-            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver") as mock_saver:
-                # Mock the checkpointer context manager
-                mock_checkpointer = AsyncMock()
-                mock_saver.from_conn_string.return_value.__aenter__ = AsyncMock(return_value=mock_checkpointer)
-                mock_saver.from_conn_string.return_value.__aexit__ = AsyncMock()
-
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
                 with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
                     # Mock the graph to return a simple response
                     mock_graph = AsyncMock()
 
-                    # Simulate agent producing a response
-                    from langchain_core.messages import AIMessage
-                    async def mock_astream(*args, **kwargs):
-                        yield {"agent": {"messages": [AIMessage(content="Test response")]}}
+                    # Simulate agent streaming a response token by token
+                    async def mock_astream_events(*args, **kwargs):
+                        for event in _model_events("Test ", "response"):
+                            yield event
 
-                    mock_graph.astream = mock_astream
+                    mock_graph.astream_events = mock_astream_events
                     mock_workflow.return_value.compile.return_value = mock_graph
 
                     from src.graphs.ops_assistant_graph import run_assistant
@@ -38,10 +77,12 @@ class TestRunAssistantStreaming:
                     async for event_type, data in run_assistant("test message", stream_events=True):
                         events.append((event_type, data))
 
-                    # Should yield final response
-                    assert len(events) == 1
-                    assert events[0][0] == "response"
-                    assert events[0][1] == "Test response"
+                    # Should yield each chunk, then the final response
+                    assert events == [
+                        ("response_chunk", "Test "),
+                        ("response_chunk", "response"),
+                        ("response", "Test response"),
+                    ]
 
     @pytest.mark.asyncio
     async def test_streaming_yields_tool_call_events(self):
@@ -49,31 +90,28 @@ class TestRunAssistantStreaming:
         with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
             mock_settings.return_value.pg_dsn = "postgresql://test"
 
-            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver") as mock_saver:
-                mock_checkpointer = AsyncMock()
-                mock_saver.from_conn_string.return_value.__aenter__ = AsyncMock(return_value=mock_checkpointer)
-                mock_saver.from_conn_string.return_value.__aexit__ = AsyncMock()
-
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
                 with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
                     mock_graph = AsyncMock()
 
-                    from langchain_core.messages import AIMessage, ToolMessage
-                    async def mock_astream(*args, **kwargs):
+                    from langchain_core.messages import ToolMessage
+                    async def mock_astream_events(*args, **kwargs):
                         # Agent decides to call a tool
-                        ai_msg = AIMessage(content="", tool_calls=[
-                            {"name": "search_orders", "args": {"query": "test"}}
-                        ])
-                        yield {"agent": {"messages": [ai_msg]}}
+                        for event in _model_events(tool_calls=[
+                            {"name": "search_orders", "args": {"query": "test"}, "id": "123"}
+                        ]):
+                            yield event
 
-                        # Tool returns result
+                        # Tool runs and returns result
+                        yield {"event": "on_tool_start", "name": "search_orders", "data": {"input": {"query": "test"}}}
                         tool_msg = ToolMessage(content="Tool result", tool_call_id="123")
-                        yield {"tools": {"messages": [tool_msg]}}
+                        yield {"event": "on_tool_end", "name": "search_orders", "data": {"output": tool_msg}}
 
                         # Agent produces final response
-                        final_msg = AIMessage(content="Final answer")
-                        yield {"agent": {"messages": [final_msg]}}
+                        for event in _model_events("Final answer"):
+                            yield event
 
-                    mock_graph.astream = mock_astream
+                    mock_graph.astream_events = mock_astream_events
                     mock_workflow.return_value.compile.return_value = mock_graph
 
                     from src.graphs.ops_assistant_graph import run_assistant
@@ -82,14 +120,15 @@ class TestRunAssistantStreaming:
                     async for event_type, data in run_assistant("test", stream_events=True):
                         events.append((event_type, data))
 
-                    # Should have tool_call, tool_result, and response events
-                    assert len(events) == 3
+                    # Should have tool_call, tool_result, response_chunk, and response events
+                    assert len(events) == 4
                     assert events[0][0] == "tool_call"
                     assert events[0][1]["name"] == "search_orders"
                     assert events[0][1]["args"] == {"query": "test"}
-                    assert events[1][0] == "tool_result"
-                    assert events[2][0] == "response"
-                    assert events[2][1] == "Final answer"
+                    assert events[1] == ("tool_result", {"content": "Tool result"})
+                    assert events[2] == ("response_chunk", "Final answer")
+                    assert events[3][0] == "response"
+                    assert events[3][1] == "Final answer"
 
     @pytest.mark.asyncio
     async def test_streaming_handles_errors_gracefully(self):
@@ -97,19 +136,16 @@ class TestRunAssistantStreaming:
         with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
             mock_settings.return_value.pg_dsn = "postgresql://test"
 
-            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver") as mock_saver:
-                mock_checkpointer = AsyncMock()
-                mock_saver.from_conn_string.return_value.__aenter__ = AsyncMock(return_value=mock_checkpointer)
-                mock_saver.from_conn_string.return_value.__aexit__ = AsyncMock()
-
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
                 with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
                     mock_graph = AsyncMock()
 
                     # Simulate an error during streaming
-                    async def mock_astream(*args, **kwargs):
+                    async def mock_astream_events(*args, **kwargs):
                         raise RuntimeError("Test error")
+                        yield  # pragma: no cover - makes this an async generator
 
-                    mock_graph.astream = mock_astream
+                    mock_graph.astream_events = mock_astream_events
                     mock_workflow.return_value.compile.return_value = mock_graph
 
                     from src.graphs.ops_assistant_graph import run_assistant
@@ -131,11 +167,7 @@ class TestRunAssistantStreaming:
         with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
             mock_settings.return_value.pg_dsn = "postgresql://test"
 
-            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver") as mock_saver:
-                mock_checkpointer = AsyncMock()
-                mock_saver.from_conn_string.return_value.__aenter__ = AsyncMock(return_value=mock_checkpointer)
-                mock_saver.from_conn_string.return_value.__aexit__ = AsyncMock()
-
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
                 with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
                     mock_graph = AsyncMock()
 
@@ -146,7 +178,7 @@ class TestRunAssistantStreaming:
                             HumanMessage(content="test"),
                             AIMessage(content="Test response")
                         ],
-                        "iteration": 1
+                        "total_tokens": 0
                     })
 
                     mock_workflow.return_value.compile.return_value = mock_graph
@@ -168,11 +200,7 @@ class TestRunAssistantStreaming:
         with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
             mock_settings.return_value.pg_dsn = "postgresql://test"
 
-            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver") as mock_saver:
-                mock_checkpointer = AsyncMock()
-                mock_saver.from_conn_string.return_value.__aenter__ = AsyncMock(return_value=mock_checkpointer)
-                mock_saver.from_conn_string.return_value.__aexit__ = AsyncMock()
-
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
                 with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
                     mock_graph = AsyncMock()
 
@@ -193,27 +221,47 @@ class TestRunAssistantStreaming:
                     assert events[1][0] == "response"
                     assert "error occurred" in events[1][1].lower()
 
+    @pytest.mark.asyncio
+    async def test_non_streaming_handles_iteration_limit(self):
+        """Hitting the recursion limit ends the turn with the fallback response, not an error."""
+        from langgraph.errors import GraphRecursionError
+
+        with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
+            mock_settings.return_value.max_iterations = 6
+
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
+                with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
+                    mock_graph = AsyncMock()
+                    mock_graph.ainvoke = AsyncMock(side_effect=GraphRecursionError("Recursion limit of 13 reached"))
+                    mock_workflow.return_value.compile.return_value = mock_graph
+
+                    from src.graphs.ops_assistant_graph import run_assistant
+
+                    events = []
+                    async for event_type, data in run_assistant("test", thread_id="t1", stream_events=False):
+                        events.append((event_type, data))
+
+                    assert events == [("response", "I couldn't complete that request.")]
+                    config = mock_graph.ainvoke.call_args[0][1]
+                    assert config == {"configurable": {"thread_id": "t1"}, "recursion_limit": 13}
+
     @pytest.mark.asyncio
     async def test_streaming_handles_no_final_response(self):
         """Streaming mode handles case where agent produces no response."""
         with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
             mock_settings.return_value.pg_dsn = "postgresql://test"
 
-            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver") as mock_saver:
-                mock_checkpointer = AsyncMock()
-                mock_saver.from_conn_string.return_value.__aenter__ = AsyncMock(return_value=mock_checkpointer)
-                mock_saver.from_conn_string.return_value.__aexit__ = AsyncMock()
-
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
                 with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
                     mock_graph = AsyncMock()
 
                     # Stream completes but no final response
-                    async def mock_astream(*args, **kwargs):
+                    async def mock_astream_events(*args, **kwargs):
                         # Simulate agent running but not producing content
-                        from langchain_core.messages import AIMessage
-                        yield {"agent": {"messages": [AIMessage(content="")]}}
+                        for event in _model_events():
+                            yield event
 
-                    mock_graph.astream = mock_astream
+                    mock_graph.astream_events = mock_astream_events
                     mock_workflow.return_value.compile.return_value = mock_graph
 
                     from src.graphs.ops_assistant_graph import run_assistant
@@ -228,34 +276,81 @@ class TestRunAssistantStreaming:
                     assert events[0][1] == "I couldn't complete that request."
 
     @pytest.mark.asyncio
-    async def test_streaming_handles_tool_call_objects(self):
-        """Streaming mode handles tool calls as objects (not just dicts)."""
+    async def test_streaming_discards_preamble_before_tool_call(self):
+        """Text streamed before a tool call is not reported as the final response."""
         with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
             mock_settings.return_value.pg_dsn = "postgresql://test"
 
-            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver") as mock_saver:
-                mock_checkpointer = AsyncMock()
-                mock_saver.from_conn_string.return_value.__aenter__ = AsyncMock(return_value=mock_checkpointer)
-                mock_saver.from_conn_string.return_value.__aexit__ = AsyncMock()
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
+                with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
+                    mock_graph = AsyncMock()
+
+                    async def mock_astream_events(*args, **kwargs):
+                        for event in _model_events("Let me check.", tool_calls=[
+                            {"name": "search_inventory", "args": {"query": "milk"}, "id": "1"}
+                        ]):
+                            yield event
+                        yield {"event": "on_tool_start", "name": "search_inventory", "data": {"input": {"query": "milk"}}}
+                        for event in _model_events("Found items"):
+                            yield event
+
+                    mock_graph.astream_events = mock_astream_events
+                    mock_workflow.return_value.compile.return_value = mock_graph
+
+                    from src.graphs.ops_assistant_graph import run_assistant
+
+                    events = []
+                    async for event_type, data in run_assistant("test", stream_events=True):
+                        events.append((event_type, data))
+
+                    assert events[-1] == ("response", "Found items")
+                    assert ("tool_call", {"name": "search_inventory", "args": {"query": "milk"}}) in events
 
+    @pytest.mark.asyncio
+    async def test_streaming_extracts_text_from_content_blocks(self):
+        """Streaming handles Anthropic-style list content blocks."""
+        with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
+            mock_settings.return_value.pg_dsn = "postgresql://test"
+
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
                 with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
                     mock_graph = AsyncMock()
 
-                    from langchain_core.messages import AIMessage
-                    async def mock_astream(*args, **kwargs):
-                        # Create a tool call as an object (not a dict)
-                        class ToolCall:
-                            def __init__(self):
-                                self.name = "search_inventory"
-                                self.args = {"query": "milk", "store_id": "store:BK-01"}
+                    async def mock_astream_events(*args, **kwargs):
+                        for event in _model_events(
+                            [{"type": "text", "text": "Hello", "index": 0}],
+                            [{"type": "tool_use", "partial_json": "{", "index": 1}],
+                        ):
+                            yield event
 
-                        ai_msg = AIMessage(content="", tool_calls=[ToolCall()])
-                        yield {"agent": {"messages": [ai_msg]}}
+                    mock_graph.astream_events = mock_astream_events
+                    mock_workflow.return_value.compile.return_value = mock_graph
 
-                        # Final response
-                        yield {"agent": {"messages": [AIMessage(content="Found items")]}}
+                    from src.graphs.ops_assistant_graph import run_assistant
 
-                    mock_graph.astream = mock_astream
+                    events = []
+                    async for event_type, data in run_assistant("test", stream_events=True):
+                        events.append((event_type, data))
+
+                    assert events == [("response_chunk", "Hello"), ("response", "Hello")]
+
+    @pytest.mark.asyncio
+    async def test_streaming_previews_structured_tool_output_as_json(self):
+        """Non-string tool output is previewed as compact JSON and truncated."""
+        with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
+            mock_settings.return_value.pg_dsn = "postgresql://test"
+
+            with patch("src.graphs.ops_assistant_graph.AsyncPostgresSaver"):
+                with patch("src.graphs.ops_assistant_graph.create_workflow") as mock_workflow:
+                    mock_graph = AsyncMock()
+                    stores = [{"store_id": f"store:BK-{i:02d}"} for i in range(20)]
+
+                    async def mock_astream_events(*args, **kwargs):
+                        yield {"event": "on_tool_end", "name": "list_stores", "data": {"output": stores}}
+                        for event in _model_events("Done"):
+                            yield event
+
+                    mock_graph.astream_events = mock_astream_events
                     mock_workflow.return_value.compile.return_value = mock_graph
 
                     from src.graphs.ops_assistant_graph import run_assistant
@@ -264,9 +359,420 @@ class TestRunAssistantStreaming:
                     async for event_type, data in run_assistant("test", stream_events=True):
                         events.append((event_type, data))
 
-                    # Should handle object-based tool calls
-                    assert len(events) == 2
-                    assert events[0][0] == "tool_call"
-                    assert events[0][1]["name"] == "search_inventory"
-                    assert events[0][1]["args"]["query"] == "milk"
-                    assert events[1][0] == "response"
+                    preview = events[0][1]["content"]
+                    assert preview.startswith('[{"store_id":"store:BK-00"},')
+                    assert len(preview) == 153 and preview.endswith("...")
+
+
+class TestGetLLM:
+    """Tests for LLM construction."""
+
+    def test_openai_temperature_depends_on_model_family(self):
+        """Reasoning models keep temperature=1, other models use 0."""
+        from src.graphs.ops_assistant_graph import get_llm
+
+        with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
+            mock_settings.return_value.anthropic_api_key = None
+            mock_settings.return_value.openai_api_key = "sk-test"
+            mock_settings.return_value.llm_cache = None
+
+            mock_settings.return_value.llm_model = "o3-mini"
+            assert get_llm().temperature == 1
+
+            mock_settings.return_value.llm_model = "gpt-4-turbo"
+            assert get_llm().temperature == 0
+
+    @pytest.mark.asyncio
+    async def test_openai_reuses_shared_http_client(self):
+        """OpenAI LLMs share one keep-alive HTTP client, closed by cleanup."""
+        import src.graphs.ops_assistant_graph as graph_module
+
+        with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
+            mock_settings.return_value.anthropic_api_key = None
+            mock_settings.return_value.openai_api_key = "sk-test"
+            mock_settings.return_value.llm_cache = None
+            mock_settings.return_value.llm_model = "gpt-4-turbo"
+
+            first = graph_module.get_llm()
+            second = graph_module.get_llm()
+            assert first.http_async_client is second.http_async_client
+
+        client = first.http_async_client
+        await graph_module.cleanup_graph_resources()
+        assert client.is_closed
+        assert graph_module._llm_http_client is None
+
+    def test_memory_llm_cache_is_installed_once(self):
+        """LLM_CACHE=memory installs an in-memory LangChain cache."""
+        import src.graphs.ops_assistant_graph as graph_module
+        from langchain_core.caches import InMemoryCache
+        from langchain_core.globals import get_llm_cache, set_llm_cache
+
+        settings = MagicMock()
+        settings.llm_cache = "memory"
+
+        with patch.object(graph_module, "_llm_cache_configured", False):
+            try:
+                graph_module._configure_llm_cache(settings)
+                cache = get_llm_cache()
+                assert isinstance(cache, InMemoryCache)
+
+                # Second call is a no-op
+                graph_module._configure_llm_cache(settings)
+                assert get_llm_cache() is cache
+            finally:
+                set_llm_cache(None)
+
+    def test_unknown_llm_cache_backend_raises(self):
+        """Unknown cache backends fail with a helpful error."""
+        import src.graphs.ops_assistant_graph as graph_module
+
+        settings = MagicMock()
+        settings.llm_cache = "memcached"
+
+        with patch.object(graph_module, "_llm_cache_configured", False):
+            with pytest.raises(ValueError, match="Unknown LLM_CACHE backend"):
+                graph_module._configure_llm_cache(settings)
+
+    def test_bound_llm_is_cached_until_reset(self):
+        """bind_tools runs once; resetting the cache rebuilds the bound LLM."""
+        import src.graphs.ops_assistant_graph as graph_module
+
+        graph_module._reset_llm_cache()
+        try:
+            with patch("src.graphs.ops_assistant_graph.get_llm") as mock_get_llm:
+                first = graph_module._get_llm_with_tools()
+                assert graph_module._get_llm_with_tools() is first
+                mock_get_llm.return_value.bind_tools.assert_called_once_with(graph_module.TOOLS)
+
+                graph_module._reset_llm_cache()
+                graph_module._get_llm_with_tools()
+                assert mock_get_llm.return_value.bind_tools.call_count == 2
+        finally:
+            graph_module._reset_llm_cache()
+
+    def test_system_message_uses_prompt_caching_for_anthropic_only(self):
+        """Anthropic gets a cache_control system block; OpenAI gets the plain prompt."""
+        import src.graphs.ops_assistant_graph as graph_module
+
+        graph_module._reset_llm_cache()
+        try:
+            with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
+                mock_settings.return_value.anthropic_api_key = "sk-ant-test"
+                block = graph_module._system_message().content[0]
+                assert block["text"] == graph_module.SYSTEM_PROMPT
+                assert block["cache_control"] == {"type": "ephemeral"}
+
+                # Provider is resolved once until the LLM cache is reset
+                mock_settings.return_value.anthropic_api_key = None
+                assert graph_module._system_message().content[0] == block
+                graph_module._reset_llm_cache()
+                assert graph_module._system_message().content == graph_module.SYSTEM_PROMPT
+        finally:
+            graph_module._reset_llm_cache()
+
+
+class TestAgentNode:
+    """Tests for the agent node message preparation."""
+
+    @pytest.mark.asyncio
+    async def test_only_invalid_messages_are_rebuilt(self):
+        """Messages with text content pass through untouched; empty/list content is fixed up."""
+        from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+        import src.graphs.ops_assistant_graph as graph_module
+
+        human = HumanMessage(content="Find milk")
+        tool_call = AIMessage(
+            content="", tool_calls=[{"name": "search_inventory", "args": {}, "id": "call_1"}]
+        )
+        list_result = ToolMessage(content=[{"id": 1}], tool_call_id="call_1")
+        empty_result = ToolMessage(content="", tool_call_id="call_2")
+
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content="Done"))
+
+        with patch.object(graph_module, "_get_llm_with_tools", return_value=mock_llm):
+            with patch.object(graph_module, "_system_message", return_value=graph_module._SYSTEM_MESSAGE):
+                await graph_module.agent_node(
+                    {"messages": [human, tool_call, list_result, empty_result], "total_tokens": 0}
+                )
+
+        sent = mock_llm.ainvoke.call_args[0][0]
+        assert sent[0] is graph_module._SYSTEM_MESSAGE
+        assert sent[1] is human
+        assert sent[2].content == "I'll use a tool to help with that."
+        assert sent[2].tool_calls == tool_call.tool_calls
+        assert sent[3].content == '[{"id":1}]'
+        assert sent[4].content == "No results found."
+
+    @pytest.mark.asyncio
+    async def test_token_usage_accumulates_across_calls(self):
+        """agent_node adds each response's total_tokens to the run's running total."""
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        import src.graphs.ops_assistant_graph as graph_module
+
+        response = AIMessage(
+            content="Done",
+            usage_metadata={"input_tokens": 900, "output_tokens": 100, "total_tokens": 1000},
+        )
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(return_value=response)
+
+        with patch.object(graph_module, "_get_llm_with_tools", return_value=mock_llm):
+            update = await graph_module.agent_node(
+                {"messages": [HumanMessage(content="Hi")], "total_tokens": 500}
+            )
+
+        assert update["total_tokens"] == 1500
+        assert update["agent_calls"] == 1
+
+    def test_should_continue_stops_at_token_limit(self):
+        """Tool loops are cut off once the token budget is spent."""
+        from langchain_core.messages import AIMessage
+
+        import src.graphs.ops_assistant_graph as graph_module
+
+        tool_call = AIMessage(content="", tool_calls=[{"name": "list_stores", "args": {}, "id": "call_1"}])
+
+        with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
+            mock_settings.return_value.max_iterations = 6
+            mock_settings.return_value.max_tokens_per_session = 50000
+
+            state = {"messages": [tool_call], "total_tokens": 1000}
+            assert graph_module.should_continue(state) == "tools"
+            assert graph_module.should_continue({**state, "total_tokens": 50000}) == "cutoff"
+            assert graph_module.should_continue({**state, "messages": [AIMessage(content="Done")]}) == "end"
+            assert graph_module.should_continue(
+                {"messages": [AIMessage(content="Done")], "total_tokens": 50000}
+            ) == "end"
+
+    def test_should_continue_stops_at_iteration_limit(self):
+        """Tool loops are cut off after max_iterations LLM calls."""
+        from langchain_core.messages import AIMessage
+
+        import src.graphs.ops_assistant_graph as graph_module
+
+        tool_call = AIMessage(content="", tool_calls=[{"name": "list_stores", "args": {}, "id": "call_1"}])
+
+        with patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings:
+            mock_settings.return_value.max_iterations = 6
+            mock_settings.return_value.max_tokens_per_session = 50000
+
+            state = {"messages": [tool_call], "total_tokens": 0, "agent_calls": 5}
+            assert graph_module.should_continue(state) == "tools"
+            assert graph_module.should_continue({**state, "agent_calls": 6}) == "cutoff"
+            assert graph_module.should_continue(
+                {**state, "messages": [AIMessage(content="Done")], "agent_calls": 6}
+            ) == "end"
+
+    @pytest.mark.asyncio
+    async def test_iteration_limit_leaves_thread_usable(self):
+        """A run cut off mid tool loop checkpoints a result for every tool call."""
+        from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+        from langgraph.checkpoint.memory import MemorySaver
+
+        import src.graphs.ops_assistant_graph as graph_module
+
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(
+            side_effect=lambda _: AIMessage(
+                content="", tool_calls=[{"name": "list_stores", "args": {}, "id": "call_1"}]
+            )
+        )
+
+        with (
+            patch("src.graphs.ops_assistant_graph.get_settings") as mock_settings,
+            patch.object(graph_module, "_get_llm_with_tools", return_value=mock_llm),
+            patch.object(graph_module, "_TOOL_NODE", AsyncMock(return_value={"messages": []})),
+        ):
+            mock_settings.return_value.max_iterations = 2
+            mock_settings.return_value.max_tokens_per_session = 50000
+            mock_settings.return_value.history_window = 0
+
+            graph = graph_module.create_workflow().compile(checkpointer=MemorySaver())
+            config = graph_module._run_config("t1")
+            final_state = await graph.ainvoke(
+                {"messages": [HumanMessage(content="Hi")], "total_tokens": 0, "agent_calls": 0}, config
+            )
+
+        assert mock_llm.ainvoke.await_count == 2
+        last_call, skipped, final = final_state["messages"][-3:]
+        assert last_call.tool_calls[0]["id"] == "call_1"
+        assert isinstance(skipped, ToolMessage) and skipped.tool_call_id == "call_1"
+        assert graph_module._final_ai_response(final_state) == "I couldn't complete that request."
+
+    def test_cutoff_answers_pending_tool_calls(self):
+        """A cut-off run leaves no tool call without a result in the thread."""
+        from langchain_core.messages import AIMessage, ToolMessage
+
+        from src.graphs.ops_assistant_graph import cutoff_node
+
+        tool_call = AIMessage(
+            content="",
+            tool_calls=[
+                {"name": "list_stores", "args": {}, "id": "call_1"},
+                {"name": "list_couriers", "args": {}, "id": "call_2"},
+            ],
+        )
+
+        update = cutoff_node({"messages": [tool_call], "total_tokens": 50000})
+
+        skipped, final = update["messages"][:-1], update["messages"][-1]
+        assert all(isinstance(msg, ToolMessage) for msg in skipped)
+        assert [(msg.tool_call_id, msg.name) for msg in skipped] == [
+            ("call_1", "list_stores"),
+            ("call_2", "list_couriers"),
+        ]
+        assert isinstance(final, AIMessage)
+        assert final.content == "I couldn't complete that request."
+        assert not final.tool_calls
+
+    def test_history_window_cuts_at_user_turns(self):
+        """Only the last k user turns are kept, including their tool call/result pairs."""
+        from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+        from src.graphs.ops_assistant_graph import _windowed
+
+        messages = [
+            HumanMessage(content="Turn 1"),
+            AIMessage(content="Answer 1"),
+            HumanMessage(content="Turn 2"),
+            AIMessage(content="", tool_calls=[{"name": "list_stores", "args": {}, "id": "call_1"}]),
+            ToolMessage(content="[]", tool_call_id="call_1"),
+            AIMessage(content="Answer 2"),
+            HumanMessage(content="Turn 3"),
+        ]
+
+        assert _windowed(messages, 2) == messages[2:]
+        assert _windowed(messages, 5) == messages
+        assert _windowed(messages, 0) == messages
+
+    def test_message_reducer_appends_without_mutating(self):
+        """The reducer appends new messages and reuses the list for empty updates."""
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        from src.graphs.ops_assistant_graph import _append_messages
+
+        left = [HumanMessage(content="Hi")]
+        reply = AIMessage(content="Hello")
+
+        merged = _append_messages(left, [reply])
+        assert merged == [left[0], reply]
+        assert left == [HumanMessage(content="Hi")]
+        assert _append_messages(left, []) is left
+
+
+class TestGraphCache:
+    """Tests for compiled graph caching."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_calls_initialize_once(self, mock_checkpointer_pool):
+        """Concurrent callers share one pooled checkpointer; later calls skip the init lock."""
+        import asyncio
+
+        import src.graphs.ops_assistant_graph as graph_module
+
+        with patch.object(graph_module, "AsyncPostgresSaver") as mock_saver:
+            with patch.object(graph_module, "create_workflow") as mock_workflow:
+                first, second = await asyncio.gather(
+                    graph_module._get_graph_and_checkpointer(),
+                    graph_module._get_graph_and_checkpointer(),
+                )
+                assert first is second is mock_workflow.return_value.compile.return_value
+                mock_checkpointer_pool.return_value.open.assert_awaited_once()
+                mock_saver.assert_called_once_with(mock_checkpointer_pool.return_value)
+                pool_kwargs = mock_checkpointer_pool.call_args[1]
+                assert pool_kwargs["kwargs"]["autocommit"] is True
+                assert pool_kwargs["check"] is graph_module.AsyncConnectionPool.check_connection
+
+                with patch.object(graph_module, "_init_lock", MagicMock()) as mock_lock:
+                    assert await graph_module._get_graph_and_checkpointer() is first
+                    mock_lock.__aenter__.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cleanup_closes_pool(self, mock_checkpointer_pool):
+        """cleanup_graph_resources closes the checkpointer pool and drops the cache."""
+        import src.graphs.ops_assistant_graph as graph_module
+
+        with patch.object(graph_module, "AsyncPostgresSaver"), patch.object(graph_module, "create_workflow"):
+            await graph_module._get_graph_and_checkpointer()
+
+        await graph_module.cleanup_graph_resources()
+
+        mock_checkpointer_pool.return_value.close.assert_awaited_once()
+        assert graph_module._cached_graph is None
+        assert graph_module._checkpointer_pool is None
+
+    @pytest.mark.asyncio
+    async def test_warm_up_builds_graph_and_llm(self, mock_checkpointer_pool, mock_ontology_prefetch):
+        """warm_graph_resources initializes everything the first request needs."""
+        import src.graphs.ops_assistant_graph as graph_module
+
+        with patch.object(graph_module, "AsyncPostgresSaver"), patch.object(graph_module, "create_workflow"):
+            with patch.object(graph_module, "_get_llm_with_tools") as mock_llm:
+                await graph_module.warm_graph_resources()
+
+                assert graph_module._cached_graph is not None
+                mock_checkpointer_pool.return_value.open.assert_awaited_once()
+                mock_llm.assert_called_once()
+                mock_ontology_prefetch.assert_called_once()
+
+
+class TestRunAssistantBatch:
+    """Tests for batched assistant runs."""
+
+    @pytest.mark.asyncio
+    async def test_batch_runs_with_bounded_concurrency(self):
+        """Each request gets its own thread; failures don't sink the batch."""
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        import src.graphs.ops_assistant_graph as graph_module
+
+        mock_graph = MagicMock()
+        mock_graph.abatch = AsyncMock(
+            return_value=[
+                {"messages": [HumanMessage(content="a"), AIMessage(content="Answer A")]},
+                RuntimeError("boom"),
+            ]
+        )
+
+        with patch.object(graph_module, "_get_graph_and_checkpointer", AsyncMock(return_value=mock_graph)):
+            responses = await graph_module.run_assistant_batch(["a", "b"], ["t1", "t2"], max_concurrency=3)
+
+        assert responses == ["Answer A", "An error occurred: boom"]
+        inputs, configs = mock_graph.abatch.call_args[0]
+        assert [state["messages"][0].content for state in inputs] == ["a", "b"]
+        assert configs == [
+            {"configurable": {"thread_id": "t1"}, "recursion_limit": 13, "max_concurrency": 3},
+            {"configurable": {"thread_id": "t2"}, "recursion_limit": 13, "max_concurrency": 3},
+        ]
+        assert mock_graph.abatch.call_args[1] == {"return_exceptions": True}
+
+    @pytest.mark.asyncio
+    async def test_batch_ignores_answers_from_earlier_turns(self):
+        """Only the run's last message counts as its response."""
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        import src.graphs.ops_assistant_graph as graph_module
+
+        mock_graph = MagicMock()
+        mock_graph.abatch = AsyncMock(
+            return_value=[
+                {"messages": [AIMessage(content="Old answer"), HumanMessage(content="b"), AIMessage(content="")]},
+            ]
+        )
+
+        with patch.object(graph_module, "_get_graph_and_checkpointer", AsyncMock(return_value=mock_graph)):
+            responses = await graph_module.run_assistant_batch(["b"], ["t1"])
+
+        assert responses == ["I couldn't complete that request."]
+
+    @pytest.mark.asyncio
+    async def test_batch_requires_a_thread_per_message(self):
+        """Mismatched inputs are rejected before any run starts."""
+        from src.graphs.ops_assistant_graph import run_assistant_batch
+
+        with pytest.raises(ValueError, match="same length"):
+            await run_assistant_batch(["a", "b"], ["t1"])
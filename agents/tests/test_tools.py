@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import httpx
+import orjson
 
 
 class TestSearchOrders:
@@ -107,6 +108,27 @@ class TestSearchOrders:
                 query_body = call_args.kwargs["json"]
                 assert query_body["size"] == 5
 
+    @pytest.mark.asyncio
+    async def test_reuses_shared_http_client(self, mock_settings, sample_search_response):
+        """Consecutive tool calls share one pooled HTTP client."""
+        with patch("src.tools.tool_search_orders.get_settings", return_value=mock_settings):
+            with patch("httpx.AsyncClient") as mock_client_class:
+                mock_response = MagicMock()
+                mock_response.json.return_value = sample_search_response
+                mock_response.raise_for_status = MagicMock()
+
+                mock_client = AsyncMock()
+                mock_client.post = AsyncMock(return_value=mock_response)
+                mock_client_class.return_value = mock_client
+
+                from src.tools.tool_search_orders import search_orders
+
+                await search_orders.ainvoke({"query": "Alex"})
+                await search_orders.ainvoke({"query": "Lisa"})
+
+                assert mock_client_class.call_count == 1
+                assert mock_client.post.call_count == 2
+
 
 class TestFetchOrderContext:
     """Tests for fetch_order_context tool."""
@@ -269,7 +291,8 @@ class TestGetContextGraph:
                     side_effect=httpx.HTTPError("Connection failed")
                 )
                 mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-                mock_client.__aexit__ = AsyncMock()
+                # Like the real client, don't swallow the error on exit
+                mock_client.__aexit__ = AsyncMock(return_value=False)
                 mock_client_class.return_value = mock_client
 
                 from src.tools.tool_get_context_graph import get_context_graph
@@ -279,6 +302,33 @@ class TestGetContextGraph:
                 assert "error" in result
 
 
+    @pytest.mark.asyncio
+    async def test_reuses_recently_fetched_schema(self, mock_settings, sample_ontology_schema):
+        """Repeat calls (and a prior prefetch) share one schema request."""
+        with patch("src.tools.tool_get_context_graph.get_settings", return_value=mock_settings):
+            with patch("httpx.AsyncClient") as mock_client_class:
+                mock_response = MagicMock()
+                mock_response.json.return_value = sample_ontology_schema
+                mock_response.raise_for_status = MagicMock()
+
+                mock_client = AsyncMock()
+                mock_client.get = AsyncMock(return_value=mock_response)
+                mock_client.__aenter__ = AsyncMock(return_value=mock_client)
+                mock_client.__aexit__ = AsyncMock()
+                mock_client_class.return_value = mock_client
+
+                from src.tools.ontology_schema import prefetch_ontology_schema
+                from src.tools.tool_get_context_graph import get_context_graph
+
+                prefetch_ontology_schema(mock_settings.agent_api_base)
+                first = await get_context_graph.ainvoke({})
+                second = await get_context_graph.ainvoke({})
+
+                assert first == second
+                assert first is second  # summary isn't rebuilt for a cached schema
+                mock_client.get.assert_called_once()
+
+
 class TestWriteTriples:
     """Tests for write_triples tool."""
 
@@ -811,6 +861,79 @@ class TestCreateOrder:
                 assert "No requested items are available" in result["error"]
                 assert "available_products" in result
 
+    def test_quick_shape_check(self):
+        """Shape check rejects triples with missing or empty fields."""
+        from src.tools.tool_create_order import _quick_shape_check
+
+        triple = {
+            "subject_id": "order:FM-1",
+            "predicate": "order_status",
+            "object_value": "CREATED",
+            "object_type": "string",
+        }
+        assert _quick_shape_check([triple]) is True
+        assert _quick_shape_check([triple, {**triple, "object_value": ""}]) is False
+        assert _quick_shape_check([{k: v for k, v in triple.items() if k != "predicate"}]) is False
+
+
+class TestInventoryCache:
+    """Tests for the shared per-store inventory snapshots."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_query(self, mock_settings):
+        """Concurrent and repeat lookups for a store reuse one OpenSearch query until invalidated."""
+        import asyncio
+
+        from src.tools.inventory_cache import get_store_inventory, invalidate_store_inventory, peek_store_inventory
+
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_response = MagicMock()
+            mock_response.json.return_value = {
+                "hits": {"hits": [{"_source": {"product_id": "product:PROD-001", "stock_level": 5}}]}
+            }
+            mock_response.raise_for_status = MagicMock()
+
+            mock_client = AsyncMock()
+            mock_client.post = AsyncMock(return_value=mock_response)
+            mock_client_class.return_value = mock_client
+
+            os_base = mock_settings.agent_os_base
+            assert peek_store_inventory(os_base, "store:BK-01") is None
+
+            first, second = await asyncio.gather(
+                get_store_inventory(os_base, "store:BK-01"),
+                get_store_inventory(os_base, "store:BK-01"),
+            )
+            assert first == second == [{"product_id": "product:PROD-001", "stock_level": 5}]
+            assert peek_store_inventory(os_base, "store:BK-01") == first
+            mock_client.post.assert_called_once()
+
+            invalidate_store_inventory(os_base, "store:BK-01")
+            await get_store_inventory(os_base, "store:BK-01")
+            assert mock_client.post.call_count == 2
+
+
+class TestTTLTaskCache:
+    """Tests for the shared single-flight TTL task cache."""
+
+    @pytest.mark.asyncio
+    async def test_failed_and_expired_fetches_are_retried(self):
+        """Failures are not cached, and successful results are reused only within the TTL."""
+        from src.tools.ttl_cache import TTLTaskCache
+
+        cache = TTLTaskCache(ttl_seconds=60.0)
+        fetch = AsyncMock(side_effect=[RuntimeError("boom"), "first", "second"])
+
+        with pytest.raises(RuntimeError):
+            await cache.get("key", fetch)
+        assert await cache.get("key", fetch) == "first"
+        assert await cache.get("key", fetch) == "first"
+        assert fetch.await_count == 2
+
+        with patch("src.tools.ttl_cache.time.monotonic", return_value=float("inf")):
+            assert cache.peek("key") is None
+            assert await cache.get("key", fetch) == "second"
+
 
 class TestSearchInventory:
     """Tests for search_inventory tool."""
@@ -896,7 +1019,7 @@ class TestSearchInventory:
 
                 # Verify store_id filter in inventory query
                 call_args = mock_client.post.call_args
-                query_body = call_args.kwargs["json"]
+                query_body = orjson.loads(call_args.kwargs["content"])
                 must_clauses = query_body["query"]["bool"]["must"]
                 assert any(
                     clause.get("term", {}).get("store_id") == "store:MAN-01"
@@ -1010,13 +1133,14 @@ class TestSearchInventory:
 
                 from src.tools.tool_search_inventory import search_inventory
 
-                results = await search_inventory.ainvoke({
+                await search_inventory.ainvoke({
                     "query": "test",
                     "limit": 3,
                 })
 
-                # Should only return 3 results even though 5 match
-                assert len(results) == 3
+                # The limit is applied by OpenSearch, not by fetching everything
+                query_body = orjson.loads(mock_client.post.call_args.kwargs["content"])
+                assert query_body["size"] == 3
 
     @pytest.mark.asyncio
     async def test_handles_missing_product_details(self, mock_settings):
@@ -1344,6 +1468,31 @@ class TestListStores:
 
                 assert results == []
 
+    @pytest.mark.asyncio
+    async def test_reuses_store_list_across_calls(self, mock_settings):
+        """Repeat calls within the TTL are served from one API request."""
+        with patch("src.tools.tool_list_stores.get_settings", return_value=mock_settings):
+            with patch("httpx.AsyncClient") as mock_client_class:
+                mock_response = MagicMock()
+                mock_response.json.return_value = [
+                    {"store_id": "store:QNS-01", "store_name": "FreshMart Queens 1", "store_zone": "QNS"},
+                    {"store_id": "store:BK-01", "store_name": "FreshMart Brooklyn 1", "store_zone": "BK"},
+                ]
+                mock_response.raise_for_status = MagicMock()
+
+                mock_client = AsyncMock()
+                mock_client.get = AsyncMock(return_value=mock_response)
+                mock_client_class.return_value = mock_client
+
+                from src.tools.tool_list_stores import list_stores
+
+                all_stores = await list_stores.ainvoke({})
+                brooklyn = await list_stores.ainvoke({"zone": "BK"})
+
+                assert len(all_stores) == 2
+                assert [store["store_id"] for store in brooklyn] == ["store:BK-01"]
+                mock_client.get.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_handles_empty_response(self, mock_settings):
         """Handles empty response from API gracefully."""
@@ -1403,7 +1552,7 @@ class TestCreateCustomer:
 
                 # Verify the triples posted
                 call_args = mock_client.post.call_args
-                triples = call_args.kwargs["json"]
+                triples = orjson.loads(call_args.kwargs["content"])
 
                 # Should have 4 triples: name, email, address, home_store
                 assert len(triples) == 4
@@ -1443,7 +1592,7 @@ class TestCreateCustomer:
 
                 # Verify the triples posted
                 call_args = mock_client.post.call_args
-                triples = call_args.kwargs["json"]
+                triples = orjson.loads(call_args.kwargs["content"])
 
                 # Should have 3 triples: name, address (dummy), and home_store
                 assert len(triples) == 3
@@ -1502,7 +1651,7 @@ class TestCreateCustomer:
                 })
 
                 call_args = mock_client.post.call_args
-                triples = call_args.kwargs["json"]
+                triples = orjson.loads(call_args.kwargs["content"])
 
                 # Verify correct object_type for each predicate
                 for triple in triples:
@@ -1582,3 +1731,73 @@ class TestCreateCustomer:
 
                 assert result["success"] is False
                 assert "error" in result
+
+
+class TestGetStoreHealth:
+    """Tests for get_store_health tool."""
+
+    @pytest.mark.asyncio
+    async def test_pool_sets_serving_cluster_per_checkout(self, mock_settings, monkeypatch):
+        """Pool sets the serving cluster on each checkout and skips the PostgreSQL reset query."""
+        from src.tools import tool_get_store_health as health
+
+        monkeypatch.setattr(health, "_pool", None)
+        with patch("src.tools.tool_get_store_health.get_settings", return_value=mock_settings):
+            with patch("asyncpg.create_pool", new=AsyncMock(return_value=MagicMock())) as create_pool:
+                await health._get_pool()
+                await health._get_pool()
+
+        create_pool.assert_awaited_once()
+        kwargs = create_pool.call_args.kwargs
+        assert kwargs["server_settings"] == {"transaction_isolation": "serializable"}
+        assert kwargs["statement_cache_size"] == 0
+
+        conn = MagicMock()
+        conn.execute = AsyncMock()
+        await kwargs["setup"](conn)
+        conn.execute.assert_awaited_once_with("SET CLUSTER = serving")
+
+        conn.execute.reset_mock()
+        await kwargs["reset"](conn)
+        conn.execute.assert_not_awaited()
+
+    def test_build_summary_totals_query_results(self):
+        """Summary keys rows by status and level and totals them in Python."""
+        from datetime import datetime, timezone
+        from decimal import Decimal
+
+        from src.tools.tool_get_store_health import _build_summary
+
+        generated_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        capacity_rows = [
+            {"health_status": "CRITICAL", "store_count": 2, "avg_utilization_pct": Decimal("97.5")},
+            {"health_status": "HEALTHY", "store_count": 5, "avg_utilization_pct": Decimal("40.0")},
+        ]
+        risk_rows = [
+            {"risk_level": "CRITICAL", "item_count": 1, "total_revenue_at_risk": Decimal("250.25")},
+            {"risk_level": "HIGH", "item_count": 6, "total_revenue_at_risk": Decimal("350.25")},
+        ]
+        pricing_row = {"total_premium": Decimal("3.00"), "base_revenue": Decimal("100.00"), "delivered_orders": 12}
+
+        result = _build_summary(generated_at, capacity_rows, risk_rows, pricing_row)
+
+        assert result["timestamp"] == generated_at.isoformat()
+        assert result["capacity"]["total_stores"] == 7
+        assert result["capacity"]["critical_stores"] == 2
+        assert result["capacity"]["strained_stores"] == 0
+        assert result["capacity"]["by_status"]["HEALTHY"] == {
+            "health_status": "HEALTHY",
+            "store_count": 5,
+            "avg_utilization_pct": Decimal("40.0"),
+        }
+        assert result["inventory_risk"]["critical_items"] == 1
+        assert result["inventory_risk"]["high_risk_items"] == 6
+        assert result["inventory_risk"]["total_revenue_at_risk"] == 600.5
+        assert result["inventory_risk"]["by_risk_level"]["HIGH"]["total_revenue_at_risk"] == Decimal("350.25")
+        assert result["pricing_yield"] == {
+            "total_premium": 3.0,
+            "base_revenue": 100.0,
+            "yield_percentage": 3.0,
+            "delivered_orders": 12,
+        }
+        assert any(r.startswith("URGENT: 2 store(s)") for r in result["recommendations"])